@@ -0,0 +1,31 @@
+from benchmarks.common import measure, random_actions
+from casetta_env.casetta import compiled
+from casetta_env.casetta.casetta import Casetta
+
+
+def run(n_steps, rollout_length=1000):
+    """
+    Benchmarks the step and the rollout of the compiled backend (its equivalence with the Python modules
+    is tested in ``tests/test_compiled.py``).
+    """
+    params = {'numba': compiled.NUMBA_AVAILABLE}
+    results = []
+
+    env = Casetta(observation_mode='array', backend='compiled')
+    actions = random_actions(env, 256)
+    position = [0]
+
+    def step():
+        position[0] = (position[0] + 1) % len(actions)
+        env.step(actions[position[0]])
+
+    results.append(measure('compiled.step', step, n_steps, setup=lambda: env.reset(seed=0), params=params))
+
+    for backend in Casetta.BACKENDS:
+        env = Casetta(observation_mode='array', backend=backend)
+        actions = random_actions(env, rollout_length)
+        results.append(measure(
+            'env.rollout', lambda: env.rollout(actions), max(1, n_steps // rollout_length),
+            setup=lambda: env.reset(seed=0), params={'backend': backend, **params}, steps_per_call=rollout_length
+        ))
+    return results
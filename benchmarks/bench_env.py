@@ -0,0 +1,108 @@
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import measure, time_once
+from casetta_env.casetta.casetta import Casetta
+from casetta_env.casetta.district_casetta import DistrictCasetta
+from casetta_env.casetta.replay_casetta import ReplayCasetta
+from casetta_env.casetta.trajectory_recorder import TrajectoryRecorder
+from casetta_env.casetta.vector_casetta import VectorCasetta
+
+
+def _action_cycle(action_space, n, seed=0):
+    """
+    Returns a callable yielding ``n`` precomputed random actions in a loop.
+    """
+    action_space.seed(seed)
+    actions = [action_space.sample() for _ in range(n)]
+    position = [0]
+
+    def next_action():
+        position[0] = (position[0] + 1) % n
+        return actions[position[0]]
+
+    return next_action
+
+
+def run(n_steps, num_envs=(64, 1024), num_buildings=(500,)):
+    """
+    Benchmarks the full environment built from ``config/config.json``.
+    """
+    results = []
+    for mode in Casetta.OBSERVATION_MODES:
+        env = Casetta(observation_mode=mode)
+        next_action = _action_cycle(env.action_space, 256)
+        results.append(measure(
+            'env.step', lambda: env.step(next_action()), n_steps,
+            setup=lambda: env.reset(seed=0), params={'observation_mode': mode}
+        ))
+        results.append(time_once('env.reset', lambda: env.reset(seed=0), params={'observation_mode': mode}))
+        snapshot = env.get_snapshot()
+        results.append(measure('env.get_snapshot', env.get_snapshot, n_steps, params={'observation_mode': mode}))
+        results.append(measure('env.set_snapshot', lambda: env.set_snapshot(snapshot), n_steps,
+                               params={'observation_mode': mode}))
+
+    results.append(time_once('env.__init__', Casetta))
+
+    env = Casetta(observation_mode='array')
+    # One idle day per call, within the yearly horizon
+    results.append(measure('env.fast_forward', lambda: env.fast_forward(288), max(1, min(n_steps // 10, 300)),
+                           setup=lambda: env.reset(seed=0), params={'k': 288}, steps_per_call=288))
+
+    reward_engine = env.reward_engine
+    state = env.get_snapshot()[1:1 + len(env.state_layout)]
+    states = np.tile(state, (1024, 1))
+    results.append(measure('reward.evaluate', lambda: reward_engine.evaluate(state, {}), n_steps))
+    results.append(measure('reward.evaluate', lambda: reward_engine.evaluate(states, {}), max(1, n_steps // 10),
+                           params={'batch_size': len(states)}, steps_per_call=len(states)))
+    action_layout = env.action_layout
+    results.append(measure('action_layout.feasibility_mask', lambda: action_layout.feasibility_mask(states),
+                           max(1, n_steps // 10), params={'batch_size': len(states)}, steps_per_call=len(states)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = TrajectoryRecorder(Casetta(observation_mode='array'), directory)
+        next_action = _action_cycle(env.action_space, 256)
+        results.append(measure(
+            'recorder.step', lambda: env.step(next_action()), n_steps,
+            setup=lambda: env.reset(seed=0), params={'chunk_size': env.chunk_size}
+        ))
+        env.close()
+
+        replay = ReplayCasetta(directory)
+        rng = np.random.default_rng(0)
+        # One call more than the steps is made after the setup, to warm up caches
+        results.append(measure('replay.step', replay.step, min(n_steps, int(replay.episode_lengths.min()) - 1),
+                               setup=replay.reset))
+        results.append(measure('replay.sample', lambda: replay.sample(256, rng), max(1, n_steps // 10),
+                               params={'batch_size': 256}, steps_per_call=256))
+
+    for n in num_envs:
+        env = VectorCasetta(n)
+        actions = np.random.default_rng(0).random((16,) + env.action_space.shape)
+        position = [0]
+
+        def step():
+            position[0] = (position[0] + 1) % len(actions)
+            env.step(actions[position[0]])
+
+        results.append(measure(
+            'vector_env.step', step, max(1, n_steps // 10),
+            setup=lambda: env.reset(seed=0), params={'num_envs': n}, steps_per_call=n
+        ))
+
+    for n in num_buildings:
+        # Capped below what random actions ask for, so that the grid shares are rescaled every step
+        env = DistrictCasetta(n, grid_capacity=n * 1.0)
+        actions = np.random.default_rng(0).random((16,) + env.action_space.shape)
+        position = [0]
+
+        def step():
+            position[0] = (position[0] + 1) % len(actions)
+            env.step(actions[position[0]])
+
+        results.append(measure(
+            'district_env.step', step, max(1, n_steps // 10),
+            setup=lambda: env.reset(seed=0), params={'num_buildings': n}, steps_per_call=n
+        ))
+    return results
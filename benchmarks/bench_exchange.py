@@ -0,0 +1,46 @@
+import numpy as np
+
+from benchmarks.common import measure
+from casetta_env.modules.exchange.energy_exchange_manager import EnergyExchangeManager
+from casetta_env.modules.exchange.exchange_engine import ExchangeEngine
+
+
+class _Producer:
+    """Minimal energy producer delivering a fixed power."""
+
+    def produce_electric_energy(self, percentage):
+        return 2.0 * percentage
+
+
+class _Consumer:
+    """Minimal energy consumer accumulating what it receives."""
+
+    def __init__(self):
+        self.consumed = 0.0
+
+    def consume_electric_energy(self, amount):
+        self.consumed += amount
+
+
+def run(n_steps, sizes=(2, 4, 8, 16, 32), num_envs=(1, 256)):
+    """
+    Benchmarks the routing of an energy exchange manager, and of the exchange engine dispatching its routes,
+    with growing numbers of producers and consumers, for single and batched actions.
+    """
+    results = []
+    for size in sizes:
+        manager = EnergyExchangeManager(
+            energy_producers={f"producer{i}": _Producer() for i in range(size)},
+            energy_consumers={f"consumer{i}": _Consumer() for i in range(size)},
+        )
+        engine = ExchangeEngine([manager])
+        n_actions = len(manager.action_names)
+        for n in num_envs:
+            shape = (n_actions,) if n == 1 else (n, n_actions)
+            action = np.random.default_rng(0).random(shape)
+            for name, router in (('exchange_manager.step', manager), ('exchange_engine.step', engine)):
+                results.append(measure(
+                    name, lambda: router.step(None, action), max(1, n_steps // size),
+                    params={'producers': size, 'consumers': size, 'num_envs': n}, steps_per_call=n
+                ))
+    return results
@@ -0,0 +1,27 @@
+from benchmarks.common import measure
+from casetta_env.casetta.casetta import Casetta
+
+
+def run(n_steps):
+    """
+    Benchmarks the step/get_state cycle of every module of the default configuration in isolation.
+    The previous state and the action are fixed, so only the module itself is measured.
+    """
+    env = Casetta()
+    env.reset(seed=0)
+    env.action_space.seed(0)
+    env.step(env.action_space.sample())
+    state = env.state
+    action = dict(zip(env.action_names, env.action_space.sample().astype(float)))
+
+    results = []
+    for module in env.state_modules:
+        def cycle(module=module):
+            module.step(state, action)
+            module.get_state()
+
+        results.append(measure(
+            'module.step+get_state', cycle, n_steps,
+            setup=module.reset, params={'module': type(module).__name__}
+        ))
+    return results
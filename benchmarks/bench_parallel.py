@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+from benchmarks.common import measure
+from casetta_env.casetta.district_casetta import DistrictCasetta
+from casetta_env.casetta.parallel_district_casetta import ParallelDistrictCasetta
+
+WORKER_COUNTS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _measure_district(env, n_steps, params):
+    actions = np.random.default_rng(0).random((16,) + env.action_space.shape)
+    position = [0]
+
+    def step():
+        position[0] = (position[0] + 1) % len(actions)
+        env.step(actions[position[0]])
+
+    return measure(
+        'district_env.step', step, n_steps, setup=lambda: env.reset(seed=0), params=params,
+        steps_per_call=env.num_buildings
+    )
+
+
+def run(n_steps, num_buildings=20000, worker_counts=None):
+    """
+    Benchmarks the scaling of a large district over worker processes, against the single-process district.
+    By default every worker count of ``WORKER_COUNTS`` up to the number of CPUs is measured.
+    """
+    if worker_counts is None:
+        worker_counts = [n for n in WORKER_COUNTS if n <= os.cpu_count()]
+    n_steps = max(1, n_steps // 40)
+    grid_capacity = num_buildings * 1.0
+
+    results = [_measure_district(
+        DistrictCasetta(num_buildings, grid_capacity=grid_capacity), n_steps,
+        {'num_buildings': num_buildings, 'num_workers': 0}
+    )]
+    for num_workers in worker_counts:
+        env = ParallelDistrictCasetta(num_buildings, grid_capacity=grid_capacity, num_workers=num_workers)
+        try:
+            results.append(_measure_district(
+                env, n_steps, {'num_buildings': num_buildings, 'num_workers': num_workers, 'cpus': os.cpu_count()}
+            ))
+        finally:
+            env.close()
+    return results
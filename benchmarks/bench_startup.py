@@ -0,0 +1,77 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import time_once
+from casetta_env.casetta.casetta import Casetta
+from casetta_env.casetta.scenario import CACHE_DIR_VARIABLE, compile_scenario
+from casetta_env.utils.common import CONFIG_DIR, load_config
+
+# Timed in a fresh interpreter, so that nothing is already imported
+_COLD_START = """
+import time
+start = time.perf_counter()
+from casetta_env.casetta.casetta import Casetta
+imported = time.perf_counter()
+Casetta({config_path!r})
+print(imported - start, time.perf_counter() - imported)
+"""
+
+
+def _minimal_config_path(directory):
+    """
+    Writes a config with only the grid and the building, which imports two module classes.
+    """
+    config = load_config('config/config.json')
+    config['modules'] = {name: config['modules'][name] for name in ('grid', 'building')}
+    path = os.path.join(directory, 'minimal.json')
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    return path
+
+
+def _cold_start(config_path, repeats, cache_dir=None):
+    """
+    Returns the best import and construction latency in microseconds over fresh interpreters,
+    optionally loading the compiled scenario from an on-disk cache.
+    """
+    environment = dict(os.environ)
+    environment.pop(CACHE_DIR_VARIABLE, None)
+    if cache_dir is not None:
+        environment[CACHE_DIR_VARIABLE] = cache_dir
+    best_import, best_init = float('inf'), float('inf')
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, '-c', _COLD_START.format(config_path=config_path)],
+            capture_output=True, text=True, check=True, cwd=os.getcwd(), env=environment
+        ).stdout.split()
+        best_import = min(best_import, float(output[0]))
+        best_init = min(best_init, float(output[1]))
+    return best_import * 1e6, best_init * 1e6
+
+
+def run(n_steps, repeats=5):
+    """
+    Benchmarks the cold start of a worker: importing the environment and constructing it for the first
+    time in a fresh interpreter (compiling the scenario, or loading it from the on-disk cache), then
+    constructing it again in the same process from the compiled scenario.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        configs = {'full': os.path.join(CONFIG_DIR, 'config/config.json'),
+                   'minimal': _minimal_config_path(directory)}
+        for name, config_path in configs.items():
+            import_us, init_us = _cold_start(config_path, repeats)
+            params = {'config': name}
+            results.append({'name': 'cold_start.import', 'params': params, 'latency_us': import_us})
+            results.append({'name': 'cold_start.__init__', 'params': params, 'latency_us': init_us})
+            cache_dir = os.path.join(directory, 'scenarios')
+            compile_scenario(config_path, cache_dir=cache_dir)
+            _, cached_init_us = _cold_start(config_path, repeats, cache_dir)
+            results.append({'name': 'cold_start.__init__', 'params': {**params, 'scenario_cache': True},
+                            'latency_us': cached_init_us})
+            scenario = compile_scenario(config_path)
+            results.append(time_once('env.__init__', lambda: Casetta(scenario), params=params))
+    return results
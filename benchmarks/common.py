@@ -0,0 +1,85 @@
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+# Box spaces built from float64 bounds warn about the float32 cast, which is irrelevant here
+warnings.filterwarnings('ignore', module='gymnasium')
+
+
+def measure(name, fn, n_steps, setup=None, params=None, repeats=3, steps_per_call=1):
+    """
+    Times a callable and records its memory behaviour.
+
+    Args:
+        name (str): Name of the benchmark case.
+        fn (callable): Function executing one step, called without arguments.
+        n_steps (int): Number of calls per timed repetition.
+        setup (callable, optional): Called before every repetition (e.g. a reset).
+        params (dict, optional): Parameters of the case, stored with the result.
+        repeats (int): Number of timed repetitions; the best one is reported.
+        steps_per_call (int): Simulated steps performed by one call (e.g. the number of
+            environments of a vectorized environment).
+
+    Returns:
+        dict: Result with 'steps_per_sec', 'mean_us' (per call), 'peak_bytes_per_step'
+        (traced memory peak of a single call above the live memory before it) and
+        'net_blocks_per_step' (memory blocks left allocated per call, which should be zero).
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(n_steps):
+            fn()
+        best = min(best, time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    fn()  # Warm up caches before tracing
+    tracemalloc.start()
+    n_traced = max(1, min(n_steps, 200))
+    peak = 0
+    snapshot_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    for _ in range(n_traced):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, step_peak = tracemalloc.get_traced_memory()
+        peak = max(peak, step_peak - current)
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+
+    return {
+        'name': name,
+        'params': params or {},
+        'steps_per_sec': n_steps * steps_per_call / best,
+        'mean_us': best / n_steps * 1e6,
+        'peak_bytes_per_step': peak,
+        'net_blocks_per_step': (blocks - snapshot_blocks) / n_traced,
+    }
+
+
+def time_once(name, fn, repeats=5, params=None):
+    """
+    Times a callable executed once per repetition (e.g. construction or reset) and reports the best latency.
+    """
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return {'name': name, 'params': params or {}, 'latency_us': best * 1e6}
+
+
+def random_actions(env, n_steps, seed=0):
+    """
+    Random actions with about a third of the routes inactive and some producers asked for more than 100%,
+    shared by the compiled backend benchmark and its equivalence test.
+    """
+    rng = np.random.default_rng(seed)
+    actions = rng.random((n_steps,) + env.action_space.shape) * 1.5
+    actions[rng.random(actions.shape) < 0.3] = 0.0
+    return actions
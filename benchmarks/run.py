@@ -0,0 +1,88 @@
+"""
+Step-throughput benchmarks for Casetta.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json  # relative change against a previous run
+"""
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+
+import gymnasium
+import numpy as np
+
+from benchmarks import bench_compiled, bench_env, bench_exchange, bench_modules, bench_parallel, bench_startup
+
+SUITES = {
+    'env': bench_env.run,
+    'modules': bench_modules.run,
+    'exchange': bench_exchange.run,
+    'compiled': bench_compiled.run,
+    'startup': bench_startup.run,
+    'parallel': bench_parallel.run,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(results, baseline):
+    """
+    Prints the relative change of every result against a previous run.
+    """
+    previous = {_key(result): result for result in baseline['results']}
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        metric = 'steps_per_sec' if 'steps_per_sec' in result else 'latency_us'
+        change = result[metric] / old[metric] - 1
+        print(f"{result['name']:<28} {json.dumps(result['params']):<60} {metric}: {change:+.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suites', nargs='+', choices=list(SUITES), default=list(SUITES))
+    parser.add_argument('--steps', type=int, default=2000, help="Steps per timed repetition")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--compare', help="JSON results of a previous run to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for suite in args.suites:
+        results.extend(SUITES[suite](args.steps))
+
+    report = {
+        'commit': _git_commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'gymnasium': gymnasium.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,82 +1,401 @@
-import json
-import os
+import copy
 import random
-from copy import deepcopy
 from typing import SupportsFloat, Any
 
 import gymnasium as gym
 import numpy as np
 from gymnasium.core import ActType, ObsType
 
-from casetta_env.utils.common import merge_dataclasses, merge_box_spaces
-from casetta_env.utils.modules_factory import create_modules
+from casetta_env.casetta.scenario import compile_scenario
+from casetta_env.utils.common import get_horizon
+from casetta_env.utils.profiling import StepProfiler
+from casetta_env.utils.reward import RewardEngine
+from casetta_env.utils.scheduler import ModuleScheduler
 
 
 class Casetta(gym.Env):
     """
     A smart building simulation environment
+
+    The scenario is given by ``config_path``: the path of a JSON config (relative to ``casetta_env/casetta``),
+    a config dict or a ``Scenario`` compiled by ``compile_scenario``. Configs are compiled once per process
+    (and cached on disk with ``CASETTA_SCENARIO_CACHE``), so further environments copy the compiled modules.
+
+    Observations are returned either as merged ``State`` dataclass instances (``observation_mode='dataclass'``)
+    or as a flat float64 vector laid out as ``observation_space`` (``observation_mode='array'``).
+    In array mode the returned vector is owned by the environment and overwritten by later steps;
+    use ``observation_index`` to read single fields and copy the vector if it has to be kept.
+
+    With ``profile=True`` the wall time of every module's ``step()``/``get_state()``, of the exchange
+    engine and of state merging is returned in ``info['profile']`` and summed up by ``profile_report()``.
+
+    With ``backend='compiled'`` steps and rollouts run in a single kernel over the flat state (see
+    ``casetta_env.casetta.compiled``), compiled with numba when it is installed and in pure Python otherwise.
+
+    The reward is computed from the flat state by a ``RewardEngine`` configured by the 'reward' section of
+    the config (zero without it).
+
+    Actions are flat arrays laid out by ``action_layout`` (exchange routes of every carrier, then 'source'),
+    or dicts of values by name; ``action_mask()`` tells which of them can take effect in the current state.
     """
 
-    def __init__(self, config_path = 'config/config.json'):
+    OBSERVATION_MODES = ('dataclass', 'array')
+    BACKENDS = ('python', 'compiled')
+
+    def __init__(self, config_path = 'config/config.json', observation_mode='dataclass', profile=False,
+                 backend='python'):
         super().__init__()
-        cwd = os.getcwd()
-        config_path = os.path.join(cwd, 'casetta_env/casetta', config_path)
+        if observation_mode not in self.OBSERVATION_MODES:
+            raise ValueError(f"Unknown observation mode: {observation_mode}")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        if profile and backend != 'python':
+            raise ValueError("Profiling times the Python modules and requires `backend='python'`.")
+        self.observation_mode = observation_mode
         self.time_step = 5  # minutes
-        # Initialize modules
-        self.config = json.load(open(config_path))
-        self.modules = create_modules(self.config)
+        # Initialize modules, copied from the compiled scenario
+        self.scenario = compile_scenario(config_path)
+        self.config = self.scenario.config
+        self.modules = self.scenario.instantiate()
         self.energy_exchange_manager = self.modules['energy_exchange']
         self.thermal_exchange_manager = self.modules['thermal_exchange']
+        self.hot_water_exchange_manager = self.modules['hot_water_exchange']
+        self.exchange = self.modules['exchange']
+        self.building = self.modules['building']
+        self.data_source = self.building.data_source  # The copy of this environment, shared by its modules
+        self.state_module_names = self.scenario.state_module_names
+        self.state_modules = [self.modules[module_name] for module_name in self.state_module_names]
 
-        self.observation_space = merge_box_spaces([
-            module.observation_space
-            for module_name, module in self.modules.items() if 'exchange' not in module_name
-        ])
+        self.state_layout = self.scenario.state_layout
+        self.observation_index = self.state_layout.index
 
-        self.action_space = merge_box_spaces([
-            self.energy_exchange_manager.action_space,
-            self.thermal_exchange_manager.action_space,
-            gym.spaces.Box(low=0, high=1)
-        ])
-        self.action_names = (self.energy_exchange_manager.action_names +
-                             self.thermal_exchange_manager.action_names) + ['source']
+        # Copied, as spaces hold their own random generator
+        self.observation_space = copy.deepcopy(
+            self.scenario.observation_spaces[np.dtype(np.float64 if observation_mode == 'array' else np.float32)]
+        )
+        self.action_space = copy.deepcopy(self.scenario.action_space)
+        self.action_layout = self.scenario.action_layout
+        self.action_names = self.action_layout.names
+        self._routing_actions = self.action_layout.routing
 
         self.state = None  # Holds the merged observation state
 
+        # Double-buffered flat state used in array mode: modules read the previous state
+        # through a read-only view while the new one is written into the other buffer.
+        self._buffers = (np.zeros(len(self.state_layout)), np.zeros(len(self.state_layout)))
+        self._views = tuple(self.state_layout.view(buffer) for buffer in self._buffers)
+        self._front = 0
+
+        self.profiler = StepProfiler() if profile else None
+        self.scheduler = ModuleScheduler(self.state_modules, self.building)
+
+        self.reward_engine = RewardEngine(self.state_layout, self.config.get('reward'))
+        self._reward_state = np.zeros(len(self.state_layout))  # Flat state scored and masked in dataclass mode
+
+        # Snapshot layout: episode offset in the data source, current state, then each module's snapshot fields
+        self._episode_offset = 0
+        self._snapshot_slices = []
+        position = 1 + len(self.state_layout)
+        for module in self.state_modules:
+            self._snapshot_slices.append(slice(position, position + len(module.snapshot_fields)))
+            position += len(module.snapshot_fields)
+        self._snapshot_size = position
+
+        # Idle spans are skipped in closed form when every module provides one; the building goes first,
+        # as the other modules read its outputs
+        self._fast_forward_order = sorted(range(len(self.state_modules)),
+                                          key=lambda i: self.state_modules[i] is not self.building)
+        self._closed_form_fast_forward = self.scheduler.single_rate and all(
+            module.supports_fast_forward for module in self.state_modules
+        )
+
+        self.engine = None
+        if backend == 'compiled':
+            from casetta_env.casetta.compiled import CompiledEngine
+            self.engine = CompiledEngine(self)
+
     def reset(self, seed=None, options=None) -> tuple[ObsType, dict[str, Any]]:
         if seed is not None:
             np.random.seed(seed)
             random.seed(seed)
 
         # Reset each module
-        self.state = merge_dataclasses(
-            "State",
-            [module.reset() for module_name, module in self.modules.items() if 'exchange' not in module_name]
-        )
+        if self.data_source is not None:
+            # Episodes start at options['start_index'], or at a random offset when 'random_start' is set
+            self.data_source.start_episode(
+                get_horizon(self.config) + 1,
+                start_index=(options or {}).get('start_index'),
+                random_start=self.config['data_source'].get('random_start', False)
+            )
+            self._episode_offset = self.data_source.offset
+        outputs = [module.reset() for module in self.state_modules]
+        self.scheduler.reset(outputs)
+        if self.observation_mode == 'array':
+            self._front = 0
+            self.state = self.state_layout.fill(self._buffers[self._front], outputs)
+        else:
+            self.state = self.state_layout.merge(outputs)
         return self.state, {}
 
     def step(self, action: ActType) -> tuple[ObsType, SupportsFloat, bool, bool, dict[str, Any]]:
         assert self.state is not None, "Call `reset()` before `step()`."
 
-        if not isinstance(action, dict):
-            action = dict(zip(self.action_names, action))
+        return self._step(self.action_layout.decode(action))
 
-        new_state = deepcopy(self.state)
-        for module_name, module in self.modules.items():
-            if 'exchange' not in module_name:
-                module.step(new_state, action)
+    def action_mask(self) -> np.ndarray:
+        """
+        Returns which actions can take effect from the current state, see ``ActionLayout.feasibility_mask``:
+        routes from an empty storage (or from the PV panels at night) and into a full one are False.
+        """
+        assert self.state is not None, "Call `reset()` before `action_mask()`."
+        if self.observation_mode == 'array':
+            flat_state = self.state
+        else:
+            flat_state = self.state_layout.to_array(self.state, self._reward_state)
+        return self.action_layout.feasibility_mask(flat_state)
+
+    def rollout(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict[str, Any]]:
+        """
+        Runs a whole sequence of actions in one call, with the same results as calling ``step()`` for each row.
+        The rollout stops early when the episode horizon is reached.
+
+        Args:
+            actions (np.ndarray): Actions of shape ``(T, n_actions)``.
+
+        Returns:
+            tuple: Observations of shape ``(T, len(observation_space))`` (flat, in both observation modes),
+            rewards, terminations and truncations of shape ``(T,)``, and the infos stacked into arrays
+            of shape ``(T,)`` (nested dicts are stacked key by key).
+        """
+        assert self.state is not None, "Call `reset()` before `rollout()`."
+        actions = np.asarray(actions, dtype=np.float64)
+        n_steps = len(actions)
+        observations = np.empty((n_steps, len(self.state_layout)))
+        rewards = np.zeros(n_steps)
+        terminations = np.zeros(n_steps, dtype=bool)
+        truncations = np.zeros(n_steps, dtype=bool)
+
+        n_steps, infos = self._rollout(actions, observations, rewards, terminations, truncations)
+        return (observations[:n_steps], rewards[:n_steps], terminations[:n_steps], truncations[:n_steps],
+                _stack_infos(infos))
+
+    def _rollout(self, actions, observations, rewards, terminations, truncations):
+        """
+        Fills the preallocated rollout outputs step by step. Faster engines can replace this method.
+
+        Returns:
+            tuple[int, list[dict]]: The number of executed steps and the info of each step.
+        """
+        if self.engine is not None:
+            n_steps, infos = self.engine.rollout(actions, observations, rewards, terminations, truncations)
+            if self.reward_engine.active:
+                # The kernel leaves the rewards to the engine, evaluated once over the whole rollout
+                batch_info = {}
+                rewards[:n_steps] = self.reward_engine.evaluate(observations[:n_steps], batch_info)
+                if 'reward_terms' in batch_info:
+                    infos = [
+                        {'reward_terms': {term: values[t] for term, values in batch_info['reward_terms'].items()}}
+                        for t in range(n_steps)
+                    ]
+            return n_steps, infos
+        infos = []
+        for t, action_array in enumerate(actions):
+            state, rewards[t], terminations[t], truncations[t], info = self._step(action_array)
+            if self.observation_mode == 'array':
+                observations[t] = state
+            else:
+                self.state_layout.to_array(state, observations[t])
+            infos.append(info)
+            if terminations[t] or truncations[t]:
+                return t + 1, infos
+        return len(actions), infos
+
+    def fast_forward(self, k, action=None):
+        """
+        Advances the environment by ``k`` steps with the same action, stopping at the episode horizon.
+
+        When the action dispatches no energy (``action`` is None or all its shares are zero), the modules
+        advance all the steps at once in closed form (see ``BaseModule.fast_forward``), with batched updates
+        of the profiles and the calendar; otherwise the steps run as a ``rollout()``. Either way the final
+        state is the one ``k`` calls of ``step()`` reach.
+
+        Args:
+            k (int): Number of steps.
+            action (np.ndarray, optional): Action of every step, idle by default.
+
+        Returns:
+            tuple: The final state, the sum of the rewards, the termination and truncation flags of the last
+            step, and an info with the number of executed 'steps' and the 'totals' of every state field over
+            them (e.g. ``totals[observation_index['grid_bought_energy']]``), as well as the summed
+            'reward_terms' when the reward engine reports them.
+        """
+        assert self.state is not None, "Call `reset()` before `fast_forward()`."
+        if action is None:
+            action_array = np.zeros(len(self.action_names))
+        else:
+            action_array = np.asarray(action, dtype=np.float64).reshape(-1)
+        routing = action_array[self._routing_actions]
+        k = min(k, self.building.horizon - self.building.cursor)
+
+        if k > 0 and self._closed_form_fast_forward and not routing.any():
+            states = np.empty((k + 1, len(self.state_layout)))
+            if self.observation_mode == 'array':
+                states[0] = self.state
+            else:
+                self.state_layout.to_array(self.state, states[0])
+            previous_states = self.state_layout.view(states[:-1])
+            action = self.action_layout.view(action_array)
+            for position in self._fast_forward_order:
+                output = self.state_modules[position].fast_forward(previous_states, action)
+                self.state_layout.fill_output(states[1:], position, output)
+            observations = states[1:]
+            step_info = {}
+            rewards = self.reward_engine.evaluate(observations, step_info)
+            if self.observation_mode == 'array':
+                self._front ^= 1
+                self._buffers[self._front][:] = observations[-1]
+                self.state = self._buffers[self._front]
+            else:
+                self.state = self.state_layout.from_array(observations[-1])
+            terminated, truncated = False, self.building.is_horizon_reached
+        else:
+            observations, rewards, terminations, truncations, step_info = self.rollout(np.tile(action_array, (k, 1)))
+            terminated = bool(terminations[-1]) if k > 0 else False
+            truncated = bool(truncations[-1]) if k > 0 else self.building.is_horizon_reached
+
+        info = {'steps': len(observations), 'totals': observations.sum(axis=0)}
+        if 'reward_terms' in step_info:
+            info['reward_terms'] = {term: float(np.sum(values)) for term, values in step_info['reward_terms'].items()}
+        return self.state, float(np.sum(rewards)), terminated, truncated, info
+
+    def _step(self, action_array):
+        # Modules read the previous state through a read-only object: the frozen State itself or,
+        # in array mode, a view over the buffer that is not written during this step.
+        if self.observation_mode == 'array':
+            previous_state = self._views[self._front]
+        else:
+            previous_state = self.state
+
+        if self.engine is not None:
+            self.engine.step(action_array)
+            info = {}
+        elif self.profiler is None:
+            self._step_modules(previous_state, action_array)
+            info = {}
+        else:
+            self._step_modules_profiled(previous_state, action_array)
+            info = {'profile': self.profiler.last_step}
 
-        self.energy_exchange_manager.step(new_state, action)
-        self.thermal_exchange_manager.step(new_state, action)
-        self.state = merge_dataclasses(
-            "State",
-            [module.get_state() for module_name, module in self.modules.items() if 'exchange' not in module_name]
-        )
-        # self.state = self.energy_exchange_manager.step(new_state, action)
-        # Placeholder reward logic (zero reward)
         reward = 0.0
+        if self.reward_engine.active:
+            if self.observation_mode == 'array':
+                flat_state = self.state
+            else:
+                flat_state = self.state_layout.to_array(self.state, self._reward_state)
+            reward = self.reward_engine.evaluate(flat_state, info)
         terminated = False
-        truncated = False
-        info = {}
+        truncated = self.building.is_horizon_reached
 
         return self.state, reward, terminated, truncated, info
+
+    def get_snapshot(self) -> np.ndarray:
+        """
+        Captures the mutable numeric state of the environment (current state and the module values
+        that carry over between steps) without copying configs, spaces or profiles.
+
+        Returns:
+            np.ndarray: A flat float64 snapshot to be passed to ``set_snapshot``.
+        """
+        assert self.state is not None, "Call `reset()` before `get_snapshot()`."
+        if not self.scheduler.at_window_boundary():
+            raise ValueError("Snapshots of modules with step periods must be taken between their windows")
+        snapshot = np.empty(self._snapshot_size)
+        snapshot[0] = self._episode_offset
+        state = snapshot[1:1 + len(self.state_layout)]
+        if self.observation_mode == 'array':
+            state[:] = self._buffers[self._front]
+        else:
+            self.state_layout.to_array(self.state, state)
+        for module, sl in zip(self.state_modules, self._snapshot_slices):
+            snapshot[sl] = module.get_snapshot()
+        return snapshot
+
+    def set_snapshot(self, snapshot: np.ndarray) -> None:
+        """
+        Restores a snapshot taken with ``get_snapshot`` on an environment with the same configuration.
+        No module is reconstructed; only when the snapshot belongs to an episode starting at another
+        offset of the data source are the module profiles reloaded.
+        """
+        episode_offset = int(snapshot[0])
+        if self.data_source is not None and episode_offset != self._episode_offset:
+            self.data_source.seek(episode_offset)
+            self._episode_offset = episode_offset
+            for module in self.state_modules:
+                module.reset()
+
+        state = snapshot[1:1 + len(self.state_layout)]
+        if self.observation_mode == 'array':
+            self._buffers[self._front][:] = state
+            self.state = self._buffers[self._front]
+        else:
+            self.state = self.state_layout.from_array(state)
+        for module, sl in zip(self.state_modules, self._snapshot_slices):
+            module.set_snapshot(snapshot[sl].tolist())
+        if not self.scheduler.single_rate:
+            self.scheduler.reset(self.state_layout.split(state))
+
+    def _store_state(self, outputs):
+        """
+        Merges the module outputs into the new current state.
+        """
+        if self.observation_mode == 'array':
+            self._front ^= 1
+            self.state = self.state_layout.fill(self._buffers[self._front], outputs)
+        else:
+            self.state = self.state_layout.merge(outputs)
+
+    def _step_modules(self, previous_state, action_array):
+        self.scheduler.step(previous_state, self.action_layout.view(action_array))
+
+        self.exchange.step(previous_state, action_array[self._routing_actions])
+
+        self._store_state(self.scheduler.get_states())
+
+    def _step_modules_profiled(self, previous_state, action_array):
+        """
+        Same as ``_step_modules``, timing every section with the profiler.
+        """
+        action = self.action_layout.view(action_array)
+        profiler = self.profiler
+        profiler.start_step()
+        scheduler = self.scheduler
+        for i in scheduler.opening():
+            profiler.time(f"{self.state_module_names[i]}.step", self.state_modules[i].step, previous_state, action)
+
+        profiler.time('exchange.step', self.exchange.step, previous_state, action_array[self._routing_actions])
+
+        outputs = scheduler.outputs
+        for i in scheduler.closing():
+            outputs[i] = profiler.time(f"{self.state_module_names[i]}.get_state", self.state_modules[i].get_state)
+        profiler.time('state_merge', self._store_state, outputs)
+
+    def profile_report(self) -> str:
+        """
+        Returns a table of the cumulative and per-step time of every profiled section.
+        """
+        if self.profiler is None:
+            raise RuntimeError("Profiling is disabled, create the environment with `profile=True`.")
+        return self.profiler.report()
+
+
+def _stack_infos(infos: list[dict]) -> dict:
+    """
+    Stacks per-step info dicts into arrays with one entry per step, recursing into nested dicts.
+    """
+    if not infos:
+        return {}
+    return {
+        key: _stack_infos([info[key] for info in infos]) if isinstance(value, dict) else np.array(
+            [info[key] for info in infos])
+        for key, value in infos[0].items()
+    }
@@ -0,0 +1,474 @@
+import numpy as np
+
+from casetta_env.modules.building.building import Building
+from casetta_env.modules.building.hvac import Hvac
+from casetta_env.modules.electricity.electric_battery import ElectricBattery
+from casetta_env.modules.electricity.grid import Grid
+from casetta_env.modules.electricity.photovoltaic import PhotovoltaicPanel
+from casetta_env.modules.thermal.domestic_hot_water_tank import DomesticHotWaterTank
+from casetta_env.modules.thermal.heat_pump import HeatPump
+from casetta_env.modules.thermal.thermal_energy_storage import ThermalEnergyStorage
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Pure Python fallback: returns the function unchanged."""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+# Module kinds, used to index module_offsets (start of the module outputs in the flat state)
+# and memory_offsets (start of the module snapshot fields in the memory array)
+M_GRID, M_BATTERY, M_BUILDING, M_PV, M_HVAC, M_HEAT_PUMP, M_TES, M_DHW = range(8)
+MODULE_KINDS = {
+    Grid: M_GRID,
+    ElectricBattery: M_BATTERY,
+    Building: M_BUILDING,
+    PhotovoltaicPanel: M_PV,
+    Hvac: M_HVAC,
+    HeatPump: M_HEAT_PUMP,
+    ThermalEnergyStorage: M_TES,
+    DomesticHotWaterTank: M_DHW,
+}
+
+# Produce and consume operations of the exchange routes, per carrier
+P_GRID, P_BATTERY, P_PV, P_HEAT_PUMP, P_TES, P_DHW = range(6)
+C_GRID, C_BATTERY, C_BUILDING, C_HVAC_ELECTRIC, C_HEAT_PUMP, C_HVAC_THERMAL, C_TES, C_DHW, C_BUILDING_HOT_WATER = \
+    range(9)
+PRODUCE_OPS = {
+    'energy': {M_GRID: P_GRID, M_BATTERY: P_BATTERY, M_PV: P_PV},
+    'thermal': {M_HEAT_PUMP: P_HEAT_PUMP, M_TES: P_TES},
+    'hot_water': {M_DHW: P_DHW},
+}
+CONSUME_OPS = {
+    'energy': {M_GRID: C_GRID, M_BATTERY: C_BATTERY, M_BUILDING: C_BUILDING, M_HVAC: C_HVAC_ELECTRIC,
+               M_HEAT_PUMP: C_HEAT_PUMP},
+    'thermal': {M_HVAC: C_HVAC_THERMAL, M_TES: C_TES, M_DHW: C_DHW},
+    'hot_water': {M_BUILDING: C_BUILDING_HOT_WATER},
+}
+
+# Module parameters
+(PARAM_GRID_MAX_POWER, PARAM_EXPORT_CAP, PARAM_DEMAND_CHARGE, PARAM_STEP_HOURS, PARAM_BATTERY_CAPACITY,
+ PARAM_PV_RATED_POWER, PARAM_PV_MODULES, PARAM_HVAC_POWER_RATING, PARAM_HEAT_PUMP_POWER_RATING, PARAM_TES_CAPACITY,
+ PARAM_DHW_CAPACITY, PARAM_SET_POINT) = range(12)
+
+# Per-step accumulators of the modules
+(ACC_GRID_SOLD, ACC_GRID_BOUGHT, ACC_BATTERY_STORED, ACC_BATTERY_CHARGED, ACC_BATTERY_DISCHARGED, ACC_IN_ENERGY,
+ ACC_IN_HOT_WATER, ACC_PV_IRRADIATION, ACC_PV_PRODUCED, ACC_HVAC_ELECTRIC, ACC_HVAC_THERMAL, ACC_HEAT_PUMP_ELECTRIC,
+ ACC_TES_STORED, ACC_TES_CHARGED, ACC_TES_DISCHARGED, ACC_DHW_STORED, ACC_DHW_CHARGED, ACC_DHW_DISCHARGED) = range(18)
+N_ACC = 18
+
+DHW_DELTA_T = 50  # Same conversion as DomesticHotWaterTank._thermal_energy_to_liters
+
+
+@njit(cache=True)
+def _produce(op, value, acc, params):
+    if op == P_GRID:
+        quantity = params[PARAM_GRID_MAX_POWER] * value
+        acc[ACC_GRID_BOUGHT] += quantity
+        return quantity
+    if op == P_BATTERY:
+        amount = acc[ACC_BATTERY_STORED] * value
+        acc[ACC_BATTERY_DISCHARGED] += amount
+        return amount if acc[ACC_BATTERY_STORED] > 0 else 0.0
+    if op == P_PV:
+        power_output = (acc[ACC_PV_IRRADIATION] / 1000) * params[PARAM_PV_RATED_POWER] * params[PARAM_PV_MODULES]
+        out = value * power_output
+        acc[ACC_PV_PRODUCED] += out
+        return out
+    if op == P_HEAT_PUMP:
+        return value * (acc[ACC_HEAT_PUMP_ELECTRIC] / params[PARAM_HEAT_PUMP_POWER_RATING])
+    if op == P_TES:
+        amount = acc[ACC_TES_STORED] * value
+        acc[ACC_TES_DISCHARGED] += amount
+        return amount
+    # P_DHW
+    amount = acc[ACC_DHW_STORED] * value
+    acc[ACC_DHW_DISCHARGED] += amount
+    return amount
+
+
+@njit(cache=True)
+def _consume(op, amount, acc, params):
+    if op == C_GRID:
+        acc[ACC_GRID_SOLD] = min(acc[ACC_GRID_SOLD] + amount, params[PARAM_EXPORT_CAP])
+    elif op == C_BATTERY:
+        acc[ACC_BATTERY_CHARGED] += min(
+            amount, params[PARAM_BATTERY_CAPACITY] - acc[ACC_BATTERY_STORED] - acc[ACC_BATTERY_CHARGED])
+    elif op == C_BUILDING:
+        acc[ACC_IN_ENERGY] += amount
+    elif op == C_HVAC_ELECTRIC:
+        acc[ACC_HVAC_ELECTRIC] += amount
+    elif op == C_HEAT_PUMP:
+        acc[ACC_HEAT_PUMP_ELECTRIC] += amount
+    elif op == C_HVAC_THERMAL:
+        acc[ACC_HVAC_THERMAL] += amount
+    elif op == C_TES:
+        acc[ACC_TES_CHARGED] += min(
+            amount, params[PARAM_TES_CAPACITY] - acc[ACC_TES_STORED] - acc[ACC_TES_CHARGED])
+    elif op == C_DHW:
+        charged_water = acc[ACC_DHW_CHARGED] / (4.186 * DHW_DELTA_T)
+        acc[ACC_DHW_CHARGED] += min(amount, params[PARAM_DHW_CAPACITY] - acc[ACC_DHW_STORED] - charged_water)
+    else:  # C_BUILDING_HOT_WATER
+        acc[ACC_IN_HOT_WATER] += amount
+
+
+@njit(cache=True)
+def _clip(value, low, high):
+    return min(max(value, low), high)
+
+
+@njit(cache=True)
+def simulate(state, actions, out_states, truncations, flows, module_offsets, memory_offsets, memory, params,
+             route_slots, route_groups, route_producers, route_consumers, group_slots,
+             irradiance, external_temperature, ground_temperature, load, dhw,
+             weekday, day, month, year, hour, minute, buy_prices, sell_prices, billing_periods, block_limits,
+             block_surcharges, horizon):
+    """
+    Runs the module step chain and the exchange routing for every row of ``actions``.
+
+    Args:
+        state: Flat state before the first action.
+        actions: Actions of shape (T, n_actions).
+        out_states: Output of shape (T, len(state)), row t receives the state after action t.
+        truncations: Output of shape (T,), set when the episode horizon is reached.
+        flows: Output of shape (T, n_routes), row t receives the amount dispatched on every route by action t,
+            by action slot (see ``ExchangeEngine.flows``).
+        module_offsets, memory_offsets: Start of each module kind in the flat state and in ``memory`` (-1 if absent).
+        memory: Module snapshot fields, read before the first step and updated after the last one.
+        params: Module parameters.
+        route_slots, route_groups, route_producers, route_consumers: Action slot, producer group and
+            produce/consume operations of every route, in dispatch order.
+        group_slots: Action slots of every producer group, padded with -1, used to rebalance the actions.
+        irradiance ... minute: Building profiles and calendar over the horizon.
+        buy_prices, sell_prices, billing_periods: Grid price profiles and billing period of every step.
+        block_limits, block_surcharges: Block rates of the grid tariff.
+        horizon: Number of steps of the episode.
+
+    Returns:
+        int: The number of executed steps.
+    """
+    acc = np.zeros(N_ACC)
+    scales = np.ones(group_slots.shape[0])
+    grid, battery, building, pv = module_offsets[M_GRID], module_offsets[M_BATTERY], module_offsets[M_BUILDING], \
+        module_offsets[M_PV]
+    hvac, heat_pump, tes, dhw_tank = module_offsets[M_HVAC], module_offsets[M_HEAT_PUMP], module_offsets[M_TES], \
+        module_offsets[M_DHW]
+
+    cursor = int(memory[memory_offsets[M_BUILDING]])
+    acc[ACC_IN_ENERGY] = memory[memory_offsets[M_BUILDING] + 1]
+    acc[ACC_IN_HOT_WATER] = memory[memory_offsets[M_BUILDING] + 2]
+    grid_cursor = int(memory[memory_offsets[M_GRID]]) if grid >= 0 else 0
+    billed_energy = memory[memory_offsets[M_GRID] + 1] if grid >= 0 else 0.0
+    peak_demand = memory[memory_offsets[M_GRID] + 2] if grid >= 0 else 0.0
+    if hvac >= 0:
+        acc[ACC_HVAC_THERMAL] = memory[memory_offsets[M_HVAC] + 1]
+    hvac_temperature = memory[memory_offsets[M_HVAC] + 2] if hvac >= 0 else 0.0
+    hvac_set_point = memory[memory_offsets[M_HVAC] + 3] if hvac >= 0 else 0.0
+
+    n_steps = actions.shape[0]
+    for t in range(n_steps):
+        if cursor >= horizon:
+            return t
+        previous = state if t == 0 else out_states[t - 1]
+        out = out_states[t]
+        action = actions[t]
+        flow = flows[t]
+        flow[:] = 0.0
+
+        # Module steps
+        cursor += 1
+        external = external_temperature[cursor]
+        internal = previous[building + 1] + (external - previous[building + 1]) * 0.1
+        acc[ACC_IN_ENERGY] = 0.0
+        acc[ACC_IN_HOT_WATER] = 0.0
+        if grid >= 0:
+            bought = previous[grid + 3]
+            billed_energy = billed_energy + bought
+            peak_demand = max(peak_demand, bought / params[PARAM_STEP_HOURS])
+            grid_cursor += 1
+            if billing_periods[grid_cursor] != billing_periods[grid_cursor - 1]:
+                billed_energy = 0.0
+                peak_demand = 0.0
+            acc[ACC_GRID_SOLD] = 0.0
+            acc[ACC_GRID_BOUGHT] = 0.0
+        if battery >= 0:
+            acc[ACC_BATTERY_STORED] = previous[battery + 1]
+            acc[ACC_BATTERY_CHARGED] = 0.0
+            acc[ACC_BATTERY_DISCHARGED] = 0.0
+        if pv >= 0:
+            acc[ACC_PV_IRRADIATION] = previous[building + 4]
+            acc[ACC_PV_PRODUCED] = 0.0
+        if hvac >= 0:
+            acc[ACC_HVAC_ELECTRIC] = 0.0
+            hvac_temperature = previous[building + 1]
+            hvac_set_point = previous[building + 5]
+        if heat_pump >= 0:
+            acc[ACC_HEAT_PUMP_ELECTRIC] = 0.0
+        if tes >= 0:
+            acc[ACC_TES_STORED] = previous[tes + 1]
+            acc[ACC_TES_CHARGED] = 0.0
+            acc[ACC_TES_DISCHARGED] = 0.0
+        if dhw_tank >= 0:
+            acc[ACC_DHW_STORED] = previous[dhw_tank + 3]
+            acc[ACC_DHW_CHARGED] = 0.0
+            acc[ACC_DHW_DISCHARGED] = 0.0
+
+        # Exchange routing: rebalance the shares of every producer, then dispatch the active routes in order
+        for g in range(group_slots.shape[0]):
+            total = 0.0
+            for k in range(group_slots.shape[1]):
+                if group_slots[g, k] >= 0:
+                    total += action[group_slots[g, k]]
+            scales[g] = max(total, 1.0)
+        for r in range(route_slots.shape[0]):
+            value = action[route_slots[r]] / scales[route_groups[r]]
+            if value > 0.0:
+                produced = _produce(route_producers[r], value, acc, params)
+                flow[route_slots[r]] = produced
+                _consume(route_consumers[r], produced, acc, params)
+
+        # Module outputs
+        if grid >= 0:
+            # The energy of the step is billed at the prices of the previous state
+            out[grid + 5] = acc[ACC_GRID_BOUGHT] * previous[grid] - acc[ACC_GRID_SOLD] * previous[grid + 1]
+            block = 0
+            while billed_energy >= block_limits[block]:
+                block += 1
+            demand = acc[ACC_GRID_BOUGHT] / params[PARAM_STEP_HOURS]
+            out[grid] = buy_prices[grid_cursor] + block_surcharges[block]
+            out[grid + 1] = sell_prices[grid_cursor]
+            out[grid + 2] = acc[ACC_GRID_SOLD]
+            out[grid + 3] = acc[ACC_GRID_BOUGHT]
+            out[grid + 4] = params[PARAM_DEMAND_CHARGE] * max(demand - peak_demand, 0.0)
+        if battery >= 0:
+            capacity = params[PARAM_BATTERY_CAPACITY]
+            stored = _clip(acc[ACC_BATTERY_STORED] + (acc[ACC_BATTERY_CHARGED] - acc[ACC_BATTERY_DISCHARGED]),
+                           0, capacity)
+            acc[ACC_BATTERY_STORED] = stored
+            out[battery] = stored / capacity
+            out[battery + 1] = stored
+            out[battery + 2] = acc[ACC_BATTERY_CHARGED]
+            out[battery + 3] = acc[ACC_BATTERY_DISCHARGED]
+        out[building] = load[cursor]
+        out[building + 1] = internal
+        out[building + 2] = external
+        out[building + 3] = ground_temperature[cursor]
+        out[building + 4] = irradiance[cursor]
+        out[building + 5] = params[PARAM_SET_POINT]
+        out[building + 6] = weekday[cursor]
+        out[building + 7] = day[cursor]
+        out[building + 8] = month[cursor]
+        out[building + 9] = year[cursor]
+        out[building + 10] = hour[cursor]
+        out[building + 11] = minute[cursor]
+        out[building + 12] = dhw[cursor]
+        out[building + 13] = max(0.0, load[cursor] - acc[ACC_IN_ENERGY])
+        out[building + 14] = max(0.0, dhw[cursor] - acc[ACC_IN_HOT_WATER])
+        out[building + 15] = 0.0
+        if pv >= 0:
+            out[pv] = acc[ACC_PV_PRODUCED]
+        if hvac >= 0:
+            delta = acc[ACC_HVAC_ELECTRIC] / params[PARAM_HVAC_POWER_RATING]
+            out[hvac] = acc[ACC_HVAC_ELECTRIC]
+            out[hvac + 1] = acc[ACC_HVAC_THERMAL]
+            out[hvac + 2] = delta if hvac_set_point >= hvac_temperature else -delta
+        if heat_pump >= 0:
+            out[heat_pump] = acc[ACC_HEAT_PUMP_ELECTRIC]
+            out[heat_pump + 1] = acc[ACC_HEAT_PUMP_ELECTRIC] / params[PARAM_HEAT_PUMP_POWER_RATING]
+        if tes >= 0:
+            capacity = params[PARAM_TES_CAPACITY]
+            stored = _clip(acc[ACC_TES_STORED] + (acc[ACC_TES_CHARGED] - acc[ACC_TES_DISCHARGED]), 0, capacity)
+            acc[ACC_TES_STORED] = stored
+            out[tes] = stored / capacity
+            out[tes + 1] = stored
+            out[tes + 2] = acc[ACC_TES_CHARGED]
+            out[tes + 3] = acc[ACC_TES_DISCHARGED]
+        if dhw_tank >= 0:
+            capacity = params[PARAM_DHW_CAPACITY]
+            liters = acc[ACC_DHW_CHARGED] / (4.186 * DHW_DELTA_T)
+            stored = _clip(acc[ACC_DHW_STORED] + (liters - acc[ACC_DHW_DISCHARGED]), 0, capacity)
+            acc[ACC_DHW_STORED] = stored
+            out[dhw_tank] = stored / capacity
+            out[dhw_tank + 1] = acc[ACC_DHW_CHARGED]
+            out[dhw_tank + 2] = acc[ACC_DHW_DISCHARGED]
+            out[dhw_tank + 3] = stored
+
+        if cursor >= horizon:
+            truncations[t] = True
+            n_steps = t + 1
+            break
+
+    # Write back the values the Python modules carry between steps
+    memory[memory_offsets[M_BUILDING]] = cursor
+    memory[memory_offsets[M_BUILDING] + 1] = acc[ACC_IN_ENERGY]
+    memory[memory_offsets[M_BUILDING] + 2] = acc[ACC_IN_HOT_WATER]
+    if grid >= 0:
+        memory[memory_offsets[M_GRID]] = grid_cursor
+        memory[memory_offsets[M_GRID] + 1] = billed_energy
+        memory[memory_offsets[M_GRID] + 2] = peak_demand
+    if battery >= 0:
+        memory[memory_offsets[M_BATTERY]] = acc[ACC_BATTERY_STORED]
+        memory[memory_offsets[M_BATTERY] + 1] = acc[ACC_BATTERY_STORED] / params[PARAM_BATTERY_CAPACITY]
+    if pv >= 0:
+        memory[memory_offsets[M_PV]] = acc[ACC_PV_PRODUCED]
+    if hvac >= 0:
+        memory[memory_offsets[M_HVAC]] = acc[ACC_HVAC_ELECTRIC]
+        memory[memory_offsets[M_HVAC] + 1] = acc[ACC_HVAC_THERMAL]
+        memory[memory_offsets[M_HVAC] + 2] = hvac_temperature
+        memory[memory_offsets[M_HVAC] + 3] = hvac_set_point
+    if heat_pump >= 0:
+        memory[memory_offsets[M_HEAT_PUMP]] = acc[ACC_HEAT_PUMP_ELECTRIC]
+    if tes >= 0:
+        memory[memory_offsets[M_TES]] = acc[ACC_TES_STORED]
+        memory[memory_offsets[M_TES] + 1] = acc[ACC_TES_STORED] / params[PARAM_TES_CAPACITY]
+    if dhw_tank >= 0:
+        memory[memory_offsets[M_DHW]] = acc[ACC_DHW_STORED]
+        memory[memory_offsets[M_DHW] + 1] = acc[ACC_DHW_STORED] / params[PARAM_DHW_CAPACITY]
+    return n_steps
+
+
+class CompiledEngine:
+    """
+    Accelerated backend of Casetta: runs the physics of the built-in modules and the exchange routing as one
+    kernel over the flat state, compiled with numba when it is installed and in pure Python otherwise.
+    The Python modules are kept in sync through their snapshot fields, so both backends can be mixed.
+    """
+
+    def __init__(self, env):
+        """
+        Args:
+            env (Casetta): The environment to accelerate; every module must be one of the built-in classes.
+        """
+        self.env = env
+        self.module_offsets = np.full(len(MODULE_KINDS), -1, dtype=np.int64)
+        self.memory_offsets = np.full(len(MODULE_KINDS), -1, dtype=np.int64)
+        self.modules = {}
+        memory_start = 1 + len(env.state_layout)
+        for module, sl, snapshot_slice in zip(env.state_modules, env.state_layout.slices, env._snapshot_slices):
+            kind = MODULE_KINDS.get(type(module))
+            if kind is None:
+                raise ValueError(f"The compiled backend does not support the module {type(module).__name__}")
+            if kind in self.modules:
+                raise ValueError(f"The compiled backend supports a single {type(module).__name__} module")
+            self.modules[kind] = module
+            self.module_offsets[kind] = sl.start
+            self.memory_offsets[kind] = snapshot_slice.start - memory_start
+        if any(module.step_period != 1 for module in env.state_modules):
+            raise ValueError("The compiled backend does not support module step periods")
+        if M_BUILDING not in self.modules:
+            raise ValueError("The compiled backend requires a building module")
+        self.memory_size = env._snapshot_size - memory_start
+
+        def param(kind, attribute):
+            return float(getattr(self.modules[kind], attribute)) if kind in self.modules else 1.0
+
+        grid = self.modules.get(M_GRID)
+        export_cap = grid.tariff.export_cap if grid is not None else None
+        self.params = np.array([
+            param(M_GRID, 'max_power'),
+            np.inf if export_cap is None else export_cap,
+            grid.tariff.demand_charge if grid is not None else 0.0,
+            param(M_GRID, 'step_hours'),
+            param(M_BATTERY, 'capacity'),
+            param(M_PV, 'wp'),
+            param(M_PV, 'num_modules'),
+            param(M_HVAC, 'power_rating'),
+            param(M_HEAT_PUMP, 'power_rating'),
+            param(M_TES, 'capacity'),
+            param(M_DHW, 'capacity'),
+            self.modules[M_BUILDING].temperature_set_point,
+        ])
+
+        # Routing table of the exchange engine, in its dispatch order
+        kinds = {id(module): kind for kind, module in self.modules.items()}
+        exchange = env.exchange
+        self.group_slots = np.where(exchange._group_slots < exchange.n_actions, exchange._group_slots, -1)
+        self.route_slots = np.array([slot for slot, *_ in exchange.routes], dtype=np.int64)
+        self.route_groups = exchange.route_group[self.route_slots].astype(np.int64)
+        self.route_producers = np.array([
+            PRODUCE_OPS[manager.prefix][kinds[id(producer)]] for _, manager, producer, _ in exchange.routes
+        ], dtype=np.int64)
+        self.route_consumers = np.array([
+            CONSUME_OPS[manager.prefix][kinds[id(consumer)]] for _, manager, _, consumer in exchange.routes
+        ], dtype=np.int64)
+
+        self._memory = np.zeros(self.memory_size)
+        self._state = np.zeros(len(env.state_layout))
+        self._out = np.zeros((1, len(env.state_layout)))
+        self._truncations = np.zeros(1, dtype=bool)
+        self._flows = np.zeros((1, exchange.n_actions))
+
+    def _profiles(self):
+        # Profiles are fetched on every call: a reset may load new data-source windows
+        building = self.modules[M_BUILDING]
+        calendar = building.calendar
+        grid = self.modules.get(M_GRID)
+        if grid is not None:
+            grid_profiles = (np.asarray(grid.price_profiles['buy']), np.asarray(grid.price_profiles['sell']),
+                             grid.billing_periods, grid.tariff.block_limits, grid.tariff.block_surcharges)
+        else:
+            grid_profiles = (np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64), np.full(1, np.inf), np.zeros(1))
+        return (
+            np.asarray(building.irradiance_profile), np.asarray(building.external_temperature_profile),
+            np.asarray(building.ground_temperature_profile), np.asarray(building.load_profile),
+            np.asarray(building.dhw_profile),
+            *(np.asarray(calendar[name]) for name in ('weekday', 'day', 'month', 'year', 'hour', 'minute')),
+            *grid_profiles,
+            building.horizon,
+        )
+
+    def _current_state(self):
+        env = self.env
+        if env.observation_mode == 'array':
+            return env._buffers[env._front]
+        return env.state_layout.to_array(env.state, self._state)
+
+    def _run(self, state, actions, out_states, truncations, flows):
+        memory = self._memory
+        for kind, module in self.modules.items():
+            start = self.memory_offsets[kind]
+            memory[start:start + len(module.snapshot_fields)] = module.get_snapshot()
+        n_steps = simulate(
+            state, actions, out_states, truncations, flows, self.module_offsets, self.memory_offsets, memory, self.params,
+            self.route_slots, self.route_groups, self.route_producers, self.route_consumers, self.group_slots,
+            *self._profiles()
+        )
+        for kind, module in self.modules.items():
+            start = self.memory_offsets[kind]
+            module.set_snapshot(memory[start:start + len(module.snapshot_fields)].tolist())
+        if n_steps > 0:
+            self.env.exchange.flows = flows[n_steps - 1].copy()
+        return n_steps
+
+    def _store_state(self, state):
+        env = self.env
+        if env.observation_mode == 'array':
+            env._front ^= 1
+            env._buffers[env._front][:] = state
+            env.state = env._buffers[env._front]
+        else:
+            env.state = env.state_layout.from_array(state)
+
+    def step(self, action_array):
+        """
+        Advances the environment by one step.
+        """
+        assert not self.modules[M_BUILDING].is_horizon_reached, "The episode horizon is over, call `reset()`."
+        self._truncations[0] = False
+        self._run(self._current_state(), action_array[None], self._out, self._truncations, self._flows)
+        self._store_state(self._out[0])
+
+    def rollout(self, actions, observations, rewards, terminations, truncations):
+        """
+        Runs all the actions in one kernel call, see ``Casetta._rollout``.
+        """
+        flows = np.zeros((len(actions), self.env.exchange.n_actions))
+        n_steps = self._run(self._current_state(), actions, observations, truncations, flows)
+        if n_steps > 0:
+            self._store_state(observations[n_steps - 1])
+        return n_steps, [{} for _ in range(n_steps)]
@@ -0,0 +1,209 @@
+import random
+from typing import SupportsFloat, Any
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.core import ActType, ObsType
+
+from casetta_env.casetta.scenario import compile_scenario
+from casetta_env.modules.core.energy_producer import EnergyProducer
+from casetta_env.modules.electricity.grid import Grid
+from casetta_env.utils.common import get_horizon
+from casetta_env.utils.reward import RewardEngine
+from casetta_env.utils.scheduler import ModuleScheduler
+
+
+class DistrictCasetta(gym.Env):
+    """
+    A district of ``num_buildings`` smart buildings behind one shared grid connection.
+
+    Every building has its own copy of the modules of the config (battery, PV, heat pump, ...), stepped as
+    one batch like ``VectorCasetta``: observations are rows of a ``(num_buildings, len(layout))`` array and
+    actions rows of a ``(num_buildings, n_actions)`` array. The buildings share the weather, the prices
+    and the clock. The reward is the sum of the rewards of the buildings, given one by one in
+    ``info['building_rewards']``. With a ``grid_capacity``, the energy flowing through the grid connection in one
+    step is capped in both directions: when the buildings ask to buy (or to sell) more, the shares of all their
+    routes from (or into) the grid are scaled down by the same factor before routing. The returned observation
+    array is owned by the environment and overwritten by later steps.
+    """
+
+    def __init__(self, num_buildings: int, config_path='config/config.json', grid_capacity=None):
+        """
+        Args:
+            num_buildings (int): Number of buildings of the district.
+            config_path (str | dict | Scenario): Config of a single building, shared by all of them,
+                see ``compile_scenario``.
+            grid_capacity (float, optional): Maximum energy bought from, and sold to, the grid by the whole
+                district in one step, in kWh; unlimited by default.
+
+        Raises:
+            ValueError: With a ``grid_capacity``, if a module selling to the grid cannot tell the energy it
+                would produce before routing (see ``EnergyProducer.available_electric_energy``).
+        """
+        super().__init__()
+        self.num_buildings = num_buildings
+        self.grid_capacity = grid_capacity
+        self.scenario = compile_scenario(config_path)
+        self.config = self.scenario.config
+        self.modules = self.scenario.instantiate()
+        self.energy_exchange_manager = self.modules['energy_exchange']
+        self.thermal_exchange_manager = self.modules['thermal_exchange']
+        self.hot_water_exchange_manager = self.modules['hot_water_exchange']
+        self.exchange = self.modules['exchange']
+        self.building = self.modules['building']
+        self.data_source = self.building.data_source  # The copy of this environment, shared by its modules
+        self.state_module_names = self.scenario.state_module_names
+        self.state_modules = [self.modules[module_name] for module_name in self.state_module_names]
+
+        self.state_layout = self.scenario.state_layout
+        self.observation_index = self.state_layout.index
+
+        self.observation_space = _batch_box(self.scenario.observation_spaces[np.dtype(np.float64)], num_buildings)
+        self.action_space = _batch_box(self.scenario.action_space, num_buildings)
+        self.action_layout = self.scenario.action_layout
+        self.action_names = self.action_layout.names
+        self._energy_actions = self.exchange.action_slices['energy']
+        self._routing_actions = self.action_layout.routing
+
+        # Routes drawing from and selling to the grid, and the grid output fields summed over the district
+        manager = self.energy_exchange_manager
+        grid_producers = [p for p, module in enumerate(manager.producers.values()) if isinstance(module, Grid)]
+        grid_consumers = [c for c, module in enumerate(manager.consumers.values()) if isinstance(module, Grid)]
+        self._grid_routes = np.flatnonzero(np.isin(manager.route_producer, grid_producers))
+        self._grid_max_power = np.array([manager._routes[slot][0].max_power for slot in self._grid_routes])
+        self._export_routes = np.flatnonzero(np.isin(manager.route_consumer, grid_consumers))
+        self._export_producers = [manager._routes[slot][0] for slot in self._export_routes]
+        if grid_capacity is not None:
+            for producer in self._export_producers:
+                if type(producer).available_electric_energy is EnergyProducer.available_electric_energy:
+                    raise ValueError(f"The grid capacity cannot cap the energy sold by {producer.name}")
+        grids = [module for module in self.state_modules if isinstance(module, Grid)]
+        self._bought_fields = [self.observation_index[f"{grid.prefix}_bought_energy"] for grid in grids]
+        self._sold_fields = [self.observation_index[f"{grid.prefix}_sold_energy"] for grid in grids]
+        self.reward_engine = RewardEngine(self.state_layout, self.config.get('reward'))
+        self.scheduler = ModuleScheduler(self.state_modules, self.building)
+
+        # Double-buffered batched state, see Casetta
+        self._buffers = tuple(np.zeros((num_buildings, len(self.state_layout))) for _ in range(2))
+        self._views = tuple(self.state_layout.view(buffer) for buffer in self._buffers)
+        self._front = 0
+        self.state = None
+
+    def reset(self, seed=None, options=None) -> tuple[ObsType, dict[str, Any]]:
+        if seed is not None:
+            np.random.seed(seed)
+            random.seed(seed)
+
+        if self.data_source is not None:
+            # Episodes start at options['start_index'], or at a random offset when 'random_start' is set
+            self.data_source.start_episode(
+                get_horizon(self.config) + 1,
+                start_index=(options or {}).get('start_index'),
+                random_start=self.config['data_source'].get('random_start', False)
+            )
+        outputs = [module.reset() for module in self.state_modules]
+        self.scheduler.reset(outputs)
+        self._front = 0
+        self.state = self.state_layout.fill(self._buffers[self._front], outputs)
+        return self.state, {}
+
+    def action_mask(self) -> np.ndarray:
+        """
+        Returns which actions of every building can take effect from the current state, of shape
+        ``(num_buildings, n_actions)``, see ``ActionLayout.feasibility_mask``.
+        """
+        assert self.state is not None, "Call `reset()` before `action_mask()`."
+        return self.action_layout.feasibility_mask(self.state)
+
+    def _cap_grid(self, actions, previous_state):
+        """
+        Scales the shares of the routes from the grid, then of the routes into the grid, of all buildings
+        so that the district buys and sells at most ``grid_capacity``.
+
+        The shares are first rebalanced as the energy exchange manager would do, so that scaling them
+        down is not undone by its own rebalancing.
+
+        Returns:
+            tuple[float, float]: The factors applied to the shares of the routes from and into the grid
+            (1.0 when the capacity is not exceeded).
+        """
+        if self.grid_capacity is None:
+            return 1.0, 1.0
+        energy_actions = actions[:, self._energy_actions]
+        import_factor = export_factor = 1.0
+        if len(self._grid_routes):
+            import_factor = self._cap_routes(energy_actions, self._grid_routes, self._grid_max_power)
+        if len(self._export_routes):
+            supply = np.column_stack([
+                np.broadcast_to(producer.available_electric_energy(previous_state), (self.num_buildings,))
+                for producer in self._export_producers
+            ])
+            export_factor = self._cap_routes(energy_actions, self._export_routes, supply)
+        return import_factor, export_factor
+
+    def _cap_routes(self, energy_actions, routes, supply):
+        """
+        Scales the shares of ``routes`` in place so that they move at most ``grid_capacity`` over the district,
+        given the energy each of them would move with a share of one.
+
+        Returns:
+            float: The factor applied to the shares.
+        """
+        rebalanced = self.energy_exchange_manager._rebalance_action(energy_actions)
+        shares = np.maximum(rebalanced[:, routes], 0.0)  # Inactive routes move nothing
+        requested = float((shares * supply).sum())
+        if requested <= self.grid_capacity:
+            return 1.0
+        factor = self.grid_capacity / requested
+        energy_actions[:] = rebalanced
+        energy_actions[:, routes] = shares * factor
+        return factor
+
+    def step(self, action: ActType) -> tuple[ObsType, SupportsFloat, bool, bool, dict[str, Any]]:
+        assert self.state is not None, "Call `reset()` before `step()`."
+
+        # Copied, as capping rewrites the grid shares
+        actions = np.array(action, dtype=np.float64).reshape(self.num_buildings, -1)
+        previous_state = self._views[self._front]
+        grid_factors = self._cap_grid(actions, previous_state)
+        action = self.action_layout.view(actions)
+
+        self.scheduler.step(previous_state, action)
+
+        self.exchange.step(previous_state, actions[:, self._routing_actions])
+
+        self._front ^= 1
+        self.state = self.state_layout.fill(
+            self._buffers[self._front], self.scheduler.get_states()
+        )
+
+        reward, info = self._step_info(grid_factors)
+        terminated = False
+        truncated = self.building.is_horizon_reached
+        return self.state, reward, terminated, truncated, info
+
+    def _step_info(self, grid_factors):
+        """
+        Returns:
+            tuple[float, dict]: The district reward and the info of the step just taken.
+        """
+        info = {
+            'grid_import': self.state[:, self._bought_fields].sum(),
+            'grid_export': self.state[:, self._sold_fields].sum(),
+            'grid_factor': grid_factors[0],
+            'grid_export_factor': grid_factors[1],
+        }
+        building_rewards = self.reward_engine.evaluate(self.state, info)
+        info['building_rewards'] = building_rewards
+        return float(building_rewards.sum()), info
+
+
+def _batch_box(space: gym.spaces.Box, n: int) -> gym.spaces.Box:
+    """
+    Stacks ``n`` copies of a flat Box space into a ``(n, len(space))`` Box.
+    """
+    return gym.spaces.Box(
+        low=np.tile(space.low, (n, 1)),
+        high=np.tile(space.high, (n, 1)),
+        dtype=space.dtype
+    )
@@ -0,0 +1,163 @@
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory
+from typing import SupportsFloat, Any
+
+import numpy as np
+from gymnasium.core import ActType, ObsType
+
+from casetta_env.casetta.district_casetta import DistrictCasetta
+
+
+def _shard_worker(connection, config_path, start, stop, observations_name, actions_name, n_actions):
+    """
+    Steps the buildings ``start:stop`` of a district, reading their actions from and writing their
+    observations to the shared arrays. Only commands and ``('ok', done)`` replies go through the connection;
+    a command that fails replies ``('error', traceback)`` and the worker keeps serving commands.
+    """
+    district = DistrictCasetta(stop - start, config_path)
+    observations_memory = shared_memory.SharedMemory(name=observations_name)
+    actions_memory = shared_memory.SharedMemory(name=actions_name)
+    n_fields = len(district.state_layout)
+    observations = np.ndarray((stop, n_fields), dtype=np.float64, buffer=observations_memory.buf)[start:]
+    actions = np.ndarray((stop, n_actions), dtype=np.float64, buffer=actions_memory.buf)[start:]
+    try:
+        while True:
+            command, *args = connection.recv()
+            if command == 'close':
+                break
+            try:
+                if command == 'step':
+                    state, _, _, truncated, _ = district.step(actions)
+                else:  # 'reset'
+                    state, _ = district.reset(*args)
+                    truncated = False
+                observations[:] = state
+                connection.send(('ok', truncated))
+            except Exception:
+                connection.send(('error', traceback.format_exc()))
+    finally:
+        del observations, actions  # Release the views before closing the shared blocks
+        observations_memory.close()
+        actions_memory.close()
+        connection.close()
+
+
+class ParallelDistrictCasetta(DistrictCasetta):
+    """
+    ``DistrictCasetta`` with the buildings split into contiguous shards, each stepped by a worker process.
+
+    Observations and actions live in ``multiprocessing.shared_memory`` blocks of shape
+    ``(num_buildings, ...)``: the parent writes the (capped) actions, every worker steps its rows and
+    writes their observations in place, and the parent only reduces the grid totals. Results are
+    identical to ``DistrictCasetta``. Call ``close()`` to stop the workers and free the shared memory.
+    An error in a worker is raised in the parent as a ``RuntimeError`` with the worker's traceback.
+    """
+
+    CLOSE_TIMEOUT = 5.0  # Seconds a worker gets to exit before it is terminated
+
+    def __init__(self, num_buildings: int, config_path='config/config.json', grid_capacity=None, num_workers=None,
+                 start_method=None):
+        """
+        Args:
+            num_buildings (int): Number of buildings of the district.
+            config_path (str | dict | Scenario): See ``DistrictCasetta``.
+            grid_capacity (float, optional): See ``DistrictCasetta``.
+            num_workers (int, optional): Number of worker processes, defaults to the number of CPUs.
+            start_method (str, optional): Multiprocessing start method, defaults to the platform default.
+        """
+        super().__init__(num_buildings, config_path, grid_capacity)
+        num_workers = min(num_workers or multiprocessing.cpu_count(), num_buildings)
+        n_fields = len(self.state_layout)
+        n_actions = self.action_space.shape[1]
+
+        self._observations_memory = shared_memory.SharedMemory(create=True, size=num_buildings * n_fields * 8)
+        self._actions_memory = shared_memory.SharedMemory(create=True, size=num_buildings * n_actions * 8)
+        self._observations = np.ndarray((num_buildings, n_fields), dtype=np.float64,
+                                        buffer=self._observations_memory.buf)
+        self._actions = np.ndarray((num_buildings, n_actions), dtype=np.float64, buffer=self._actions_memory.buf)
+
+        context = multiprocessing.get_context(start_method)
+        bounds = np.linspace(0, num_buildings, num_workers + 1).astype(int)
+        self.shards = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+        self._connections = []
+        self._processes = []
+        for shard in self.shards:
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=_shard_worker,
+                # The resolved config, which workers compile (or load from the scenario cache) whatever their cwd
+                args=(child_connection, self.config, shard.start, shard.stop,
+                      self._observations_memory.name, self._actions_memory.name, n_actions),
+                daemon=True
+            )
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+
+    def _broadcast(self, *message):
+        """
+        Sends a command to every worker and waits for all of them.
+
+        Returns:
+            bool: Whether any worker reported the end of the episode.
+
+        Raises:
+            RuntimeError: If a worker failed, with its traceback, or exited.
+        """
+        for connection in self._connections:
+            try:
+                connection.send(message)
+            except OSError:
+                pass  # A worker that exited is reported below
+        replies = []
+        for connection in self._connections:
+            try:
+                replies.append(connection.recv())
+            except EOFError:
+                replies.append(('error', "The worker exited unexpectedly"))
+        for status, value in replies:
+            if status == 'error':
+                raise RuntimeError(f"A district worker failed:\n{value}")
+        return any(value for _, value in replies)
+
+    def reset(self, seed=None, options=None) -> tuple[ObsType, dict[str, Any]]:
+        self._broadcast('reset', seed, options)
+        self.state = self._observations
+        return self.state, {}
+
+    def step(self, action: ActType) -> tuple[ObsType, SupportsFloat, bool, bool, dict[str, Any]]:
+        assert self.state is not None, "Call `reset()` before `step()`."
+
+        actions = self._actions
+        actions[:] = np.asarray(action, dtype=np.float64).reshape(actions.shape)
+        # The shards step independently, so the district totals are capped here from the shared observations
+        grid_factors = self._cap_grid(actions, self.state_layout.view(self.state))
+        truncated = self._broadcast('step')
+
+        reward, info = self._step_info(grid_factors)
+        terminated = False
+        return self.state, reward, terminated, truncated, info
+
+    def close(self):
+        if self._observations_memory is None:
+            return
+        try:
+            for connection in self._connections:
+                try:
+                    connection.send(('close',))
+                except (OSError, EOFError):
+                    pass  # The worker already exited
+                connection.close()
+            for process in self._processes:
+                process.join(timeout=self.CLOSE_TIMEOUT)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+        finally:
+            self._observations = self._actions = self.state = None
+            for memory in (self._observations_memory, self._actions_memory):
+                memory.close()
+                memory.unlink()
+            self._observations_memory = self._actions_memory = None
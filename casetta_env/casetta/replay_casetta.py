@@ -0,0 +1,154 @@
+import json
+import os
+from typing import SupportsFloat, Any
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.core import ObsType
+
+from casetta_env.casetta.trajectory_recorder import TrajectoryRecorder
+
+
+class ReplayCasetta(gym.Env):
+    """
+    Offline environment replaying trajectories written by ``TrajectoryRecorder``.
+
+    Shards are memory-mapped, so observations and actions are returned as read-only views of the
+    files and data is read at page-cache speed. ``step()`` ignores the given action and advances the
+    recorded episode, returning the recorded action in ``info['action']`` and the route flows in
+    ``info['flows']`` (labelled by ``flow_names``); the reward is the recorded one, or
+    ``reward_fn(observation, action, next_observation)`` to evaluate another reward without
+    re-simulating. ``sample()`` draws random transitions across all episodes for offline training.
+    """
+
+    def __init__(self, path, reward_fn=None):
+        """
+        Args:
+            path (str): Directory written by ``TrajectoryRecorder``.
+            reward_fn (callable, optional): Reward computed from the flat observation, action and next
+                observation, either of single transitions or of batches (leading batch dimension).
+
+        Raises:
+            ValueError: If the recording holds no transition.
+        """
+        super().__init__()
+        self.path = path
+        self.reward_fn = reward_fn
+        with open(os.path.join(path, TrajectoryRecorder.META_FILE)) as f:
+            meta = json.load(f)
+        self.observation_fields = meta['observation_fields']
+        self.observation_index = {name: i for i, name in enumerate(self.observation_fields)}
+        self.action_names = meta['action_names']
+        self.flow_names = meta.get('flow_names', [])  # Routes of the 'flows' column, when recorded
+        self.observation_space = _box_from_dict(meta['observation_space'])
+        self.action_space = _box_from_dict(meta['action_space'])
+
+        self.shards = [
+            {
+                name: np.load(os.path.join(path, f"{shard:06d}", f"{name}.npy"), mmap_mode='r')
+                for name in meta['columns']
+            }
+            for shard in range(len(meta['shard_rows']))
+        ]
+        self.columns = meta['columns']
+        self.shard_starts = np.concatenate([[0], np.cumsum(meta['shard_rows'])]).astype(np.int64)
+        self.n_rows = int(self.shard_starts[-1])
+        if self.n_rows == 0:
+            raise ValueError(f"The recording in {path} holds no transition")
+
+        # First row and length of every episode; episodes are contiguous but may span shards
+        episodes = np.concatenate([shard['episodes'] for shard in self.shards])
+        boundaries = np.flatnonzero(np.diff(episodes)) + 1
+        self.episode_starts = np.concatenate([[0], boundaries]).astype(np.int64)
+        self.episode_lengths = np.diff(np.append(self.episode_starts, self.n_rows))
+
+        self._episode = None
+        self._row = 0  # Global row of the next transition
+        self._episode_end = 0
+
+    def __len__(self):
+        return self.n_rows
+
+    def _locate(self, row):
+        shard = int(np.searchsorted(self.shard_starts, row, side='right')) - 1
+        return self.shards[shard], row - self.shard_starts[shard]
+
+    def reset(self, seed=None, options=None) -> tuple[ObsType, dict[str, Any]]:
+        """
+        Starts the replay of an episode: ``options['episode']`` if given, otherwise the next one
+        (cycling through the recording).
+        """
+        super().reset(seed=seed)
+        if options is not None and 'episode' in options:
+            self._episode = options['episode']
+        else:
+            self._episode = 0 if self._episode is None else (self._episode + 1) % len(self.episode_starts)
+        self._row = int(self.episode_starts[self._episode])
+        self._episode_end = self._row + int(self.episode_lengths[self._episode])
+        shard, row = self._locate(self._row)
+        return shard['observations'][row], {'episode': self._episode}
+
+    def step(self, action=None) -> tuple[ObsType, SupportsFloat, bool, bool, dict[str, Any]]:
+        assert self._episode is not None, "Call `reset()` before `step()`."
+        assert self._row < self._episode_end, "The recorded episode is over, call `reset()`."
+        shard, row = self._locate(self._row)
+        self._row += 1
+        observation = shard['next_observations'][row]
+        recorded_action = shard['actions'][row]
+        if self.reward_fn is None:
+            reward = float(shard['rewards'][row])
+        else:
+            reward = self.reward_fn(shard['observations'][row], recorded_action, observation)
+        # An episode recorded only partially ends with its last row
+        truncated = bool(shard['truncations'][row]) or self._row == self._episode_end
+        info = {'action': recorded_action}
+        if 'flows' in shard:
+            info['flows'] = shard['flows'][row]
+        return observation, reward, bool(shard['terminations'][row]), truncated, info
+
+    def rows(self, start, stop):
+        """
+        Returns the columns of the rows ``start:stop`` as views of the shard files.
+        The rows must belong to a single shard.
+        """
+        shard, local = self._locate(start)
+        if stop - start > len(shard['steps']) - local:
+            raise ValueError(f"Rows {start}:{stop} span several shards")
+        return {name: column[local:local + stop - start] for name, column in shard.items()}
+
+    def sample(self, batch_size, rng=None):
+        """
+        Draws random transitions across all episodes.
+
+        Args:
+            batch_size (int): Number of transitions.
+            rng (np.random.Generator, optional): Random generator, defaults to the environment's ``np_random``.
+
+        Returns:
+            dict: A ``(batch_size, ...)`` array per column, with the rewards of ``reward_fn`` when one is set.
+        """
+        rng = self.np_random if rng is None else rng
+        indices = rng.integers(0, self.n_rows, size=batch_size)
+        shard_ids = np.searchsorted(self.shard_starts, indices, side='right') - 1
+        batch = {
+            name: np.empty((batch_size,) + column.shape[1:], dtype=column.dtype)
+            for name, column in self.shards[0].items()
+        }
+        for shard_id in np.unique(shard_ids):
+            positions = np.flatnonzero(shard_ids == shard_id)
+            local = indices[positions] - self.shard_starts[shard_id]
+            order = np.argsort(local)  # Sorted reads follow the file order
+            positions, local = positions[order], local[order]
+            for name, column in self.shards[shard_id].items():
+                batch[name][positions] = column[local]
+        if self.reward_fn is not None:
+            batch['rewards'] = self.reward_fn(batch['observations'], batch['actions'], batch['next_observations'])
+        return batch
+
+
+def _box_from_dict(space: dict) -> gym.spaces.Box:
+    return gym.spaces.Box(
+        low=np.array(space['low'], dtype=space['dtype']),
+        high=np.array(space['high'], dtype=space['dtype']),
+        dtype=space['dtype']
+    )
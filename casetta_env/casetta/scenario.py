@@ -0,0 +1,212 @@
+import copy
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from functools import lru_cache
+
+import gymnasium as gym
+import numpy as np
+
+from casetta_env.utils.action_layout import ActionLayout
+from casetta_env.utils.common import get_horizon, get_state_layout, load_config, merge_box_spaces
+from casetta_env.utils.modules_factory import create_modules
+from casetta_env.utils.timeseries import TimeSeriesSource
+
+SCENARIO_VERSION = 1  # Part of the cache key: bump it when the compiled content of a config changes
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR_VARIABLE = 'CASETTA_SCENARIO_CACHE'  # Default on-disk cache directory, disabled when unset
+
+_scenarios = {}  # Compiled scenarios of this process by key
+
+
+class Scenario:
+    """
+    Immutable compiled scenario: a validated config together with everything the environments derive from it,
+    i.e. a prototype of the module graph (with the routing tables and the precomputed profiles), the state and
+    action layouts and the spaces.
+
+    Compiling constructs the modules once; ``instantiate()`` then returns a fresh module graph by copying the
+    prototype, sharing its arrays (profiles, calendars, routing tables, tariffs), its spaces and its config
+    instead of recomputing them. The shared arrays are made read-only, and the config must not be modified.
+    Every graph gets its own copy of the data source, with the memory-mapped columns shared but its own
+    episode offset.
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config (dict): The scenario configuration, see ``compile_scenario``.
+        """
+        self.config = config
+        self.key = scenario_key(config)
+        self.horizon = get_horizon(config)
+        self.modules = create_modules(config)
+        self.state_module_names = [name for name in self.modules if 'exchange' not in name]
+        self._build_layouts()
+        state_modules = [self.modules[name] for name in self.state_module_names]
+        self.observation_spaces = {
+            np.dtype(dtype): merge_box_spaces([module.observation_space for module in state_modules], dtype=dtype)
+            for dtype in (np.float32, np.float64)
+        }
+        self.action_space = merge_box_spaces([self.modules['exchange'].action_space, gym.spaces.Box(low=0, high=1)])
+        if self.observation_spaces[np.dtype(np.float64)].shape != (len(self.state_layout),):
+            raise ValueError("Module observation spaces do not match their outputs")
+        self._frozen = True
+
+    def _build_layouts(self):
+        state_modules = [self.modules[name] for name in self.state_module_names]
+        self.state_layout = get_state_layout(
+            "State",
+            tuple(module.output_type for module in state_modules),
+            tuple(module.prefix for module in state_modules)
+        )
+        self.action_layout = ActionLayout(self.modules['exchange'], self.state_layout)
+        self._shared = _shared_objects(self.modules, self.config)
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("Compiled scenarios are immutable")
+        super().__setattr__(name, value)
+
+    def __getstate__(self):
+        # The merged state classes are created at runtime and the shared objects are keyed by id,
+        # so both are rebuilt when loading
+        state = dict(self.__dict__)
+        for name in ('state_layout', 'action_layout', '_shared', '_frozen'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_layouts()
+        self._frozen = True
+
+    def instantiate(self):
+        """
+        Returns a fresh module graph, as ``create_modules(config)`` would, without reconstructing the modules.
+        """
+        return copy.deepcopy(self.modules, dict(self._shared))
+
+
+def _shared_objects(modules, config):
+    """
+    Collects the objects reachable from the modules that their copies share, by id: arrays (made read-only),
+    lists of names, spaces and the config.
+    """
+    shared = {}
+    seen = set()
+
+    def visit(value):
+        if id(value) in seen:
+            return
+        seen.add(id(value))
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+            shared[id(value)] = value
+        elif isinstance(value, gym.Space):
+            shared[id(value)] = value
+        elif isinstance(value, TimeSeriesSource):
+            return  # Copied with its own offset, see TimeSeriesSource.__deepcopy__
+        elif isinstance(value, dict):
+            for item in value.values():
+                visit(item)
+        elif isinstance(value, (list, tuple)):
+            if value and all(isinstance(item, str) for item in value):
+                shared[id(value)] = value  # Names (of actions, fields, ...) never change after construction
+            for item in value:
+                visit(item)
+        elif hasattr(value, '__dict__') and not isinstance(value, type):
+            for item in vars(value).values():
+                visit(item)
+
+    visit(modules)
+    for value in _walk_config(config):
+        shared[id(value)] = value
+    return shared
+
+
+def _walk_config(value):
+    yield value
+    children = value.values() if isinstance(value, dict) else value if isinstance(value, list) else ()
+    for child in children:
+        yield from _walk_config(child)
+
+
+@lru_cache(maxsize=None)
+def source_hash():
+    """
+    Returns the hash of the Python sources of the package, so that compiled scenarios pickled by another
+    version of the modules are never loaded.
+    """
+    digest = hashlib.sha256()
+    for directory, subdirectories, files in os.walk(PACKAGE_DIR):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.endswith('.py'):
+                path = os.path.join(directory, name)
+                digest.update(os.path.relpath(path, PACKAGE_DIR).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def scenario_key(config):
+    """
+    Returns the content hash identifying a scenario: the hash of the canonical JSON of its config,
+    of ``SCENARIO_VERSION``, of the package sources (see ``source_hash``) and of the metadata of its
+    data source, if any.
+    """
+    content = {'version': SCENARIO_VERSION, 'sources': source_hash(), 'config': config}
+    if 'data_source' in config:
+        with open(os.path.join(config['data_source']['path'], TimeSeriesSource.META_FILE)) as f:
+            content['data_source'] = json.load(f)
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def compile_scenario(config='config/config.json', cache_dir=None):
+    """
+    Validates and compiles a scenario once, reusing earlier compilations of the same content.
+
+    Compiled scenarios are cached by ``scenario_key`` in the process and, when a cache directory is given
+    (or set in the ``CASETTA_SCENARIO_CACHE`` environment variable), on disk, so that other processes
+    load them instead of compiling them again. The on-disk cache holds pickles, and unpickling runs code:
+    only use a directory that no one else can write to.
+
+    Args:
+        config (str | dict | Scenario): Path of the JSON config (see ``load_config``), the config itself,
+            or an already compiled scenario, returned as is.
+        cache_dir (str, optional): Directory of the on-disk cache; ``False`` disables it.
+
+    Returns:
+        Scenario: The compiled scenario.
+    """
+    if isinstance(config, Scenario):
+        return config
+    config = load_config(config)
+    if 'data_source' in config:
+        # Pinned to an absolute path, so that the scenario does not depend on the working directory
+        config['data_source'] = {**config['data_source'], 'path': os.path.abspath(config['data_source']['path'])}
+    key = scenario_key(config)
+    scenario = _scenarios.get(key)
+    if scenario is not None:
+        return scenario
+
+    if cache_dir is None:
+        cache_dir = os.environ.get(CACHE_DIR_VARIABLE)
+    path = os.path.join(cache_dir, f"{key}.pkl") if cache_dir else None
+    if path is not None and os.path.exists(path):
+        with open(path, 'rb') as f:
+            scenario = pickle.load(f)
+    else:
+        scenario = Scenario(config)
+        if path is not None:
+            # Written to a temporary file first, so that concurrent workers never read a partial file
+            os.makedirs(cache_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=cache_dir, suffix='.tmp', delete=False) as f:
+                pickle.dump(scenario, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.chmod(f.name, 0o644)
+            os.replace(f.name, path)
+    _scenarios[key] = scenario
+    return scenario
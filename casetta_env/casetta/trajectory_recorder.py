@@ -0,0 +1,185 @@
+import json
+import os
+import queue
+import threading
+
+import gymnasium as gym
+import numpy as np
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    """
+    Records every transition of a ``Casetta`` environment to disk while it runs.
+
+    Transitions are written into a ring of ``n_chunks`` preallocated chunks of ``chunk_size`` rows. A full
+    chunk is handed to a background thread that saves it as a shard of ``.npy`` columns, while the
+    environment keeps filling the next chunk, so memory stays bounded whatever the episode length.
+    A step only waits when all the chunks are still being written. If writing a shard fails, the error is
+    raised by the next ``step()`` or ``close()``, and ``meta.json`` is not written.
+
+    Layout of ``path`` (see ``ReplayCasetta`` to read it back)::
+
+        meta.json                 field, action and route names, spaces and the number of rows of every shard
+        000000/observations.npy   (rows, len(state)) flat state before the action, laid out as the merged State
+        000000/actions.npy        (rows, n_actions)
+        000000/flows.npy          (rows, n_routes) amount dispatched on every exchange route, see ``ExchangeEngine``
+        000000/next_observations.npy, rewards.npy, terminations.npy, truncations.npy,
+        000000/episodes.npy, steps.npy    episode number and step within the episode of each row
+        000001/...
+
+    Call ``close()`` to flush the last chunk and write ``meta.json``.
+    """
+
+    META_FILE = 'meta.json'
+
+    def __init__(self, env, path, chunk_size=4096, n_chunks=4):
+        """
+        Args:
+            env (Casetta): The environment to record.
+            path (str): Output directory, created if needed.
+            chunk_size (int): Rows per chunk, hence per shard.
+            n_chunks (int): Chunks of the ring buffer.
+        """
+        super().__init__(env)
+        self.path = path
+        self.chunk_size = chunk_size
+        os.makedirs(path, exist_ok=True)
+        n_fields = len(env.state_layout)
+        n_actions = len(env.action_names)
+        self.columns = {
+            'observations': ((n_fields,), np.float64),
+            'actions': ((n_actions,), np.float64),
+            'flows': ((env.exchange.n_actions,), np.float64),
+            'next_observations': ((n_fields,), np.float64),
+            'rewards': ((), np.float64),
+            'terminations': ((), np.bool_),
+            'truncations': ((), np.bool_),
+            'episodes': ((), np.int64),
+            'steps': ((), np.int64),
+        }
+        self._chunks = [
+            {name: np.zeros((chunk_size,) + shape, dtype=dtype) for name, (shape, dtype) in self.columns.items()}
+            for _ in range(n_chunks)
+        ]
+        self._free_chunks = queue.Queue()
+        for index in range(n_chunks):
+            self._free_chunks.put(index)
+        self._full_chunks = queue.Queue()
+        self._write_error = None  # First error of the writer thread, raised in the calling thread
+        self._writer = threading.Thread(target=self._write_chunks, daemon=True)
+        self._writer.start()
+
+        self.shard_rows = []  # Rows of every shard, in order
+        self._chunk = None  # Chunk being filled and its next row
+        self._row = 0
+        self._observation = np.zeros(n_fields)  # Flat observation before the next action
+        self._episode = -1
+        self._step = 0
+        self._closed = False
+
+    def _write_chunks(self):
+        while True:
+            item = self._full_chunks.get()
+            if item is None:
+                return
+            index, shard, n_rows = item
+            try:
+                if self._write_error is None:  # The shards after a failed one are dropped
+                    shard_path = os.path.join(self.path, f"{shard:06d}")
+                    os.makedirs(shard_path, exist_ok=True)
+                    for name, column in self._chunks[index].items():
+                        np.save(os.path.join(shard_path, f"{name}.npy"), column[:n_rows])
+            except Exception as error:
+                self._write_error = error
+            finally:
+                # Always given back, so that a failure never blocks the environment
+                self._free_chunks.put(index)
+
+    def _raise_write_error(self):
+        if self._write_error is not None:
+            raise self._write_error
+
+    def _flush(self):
+        """
+        Queues the current chunk for writing.
+        """
+        self._raise_write_error()
+        if self._chunk is None or self._row == 0:
+            return
+        self._full_chunks.put((self._chunk, len(self.shard_rows), self._row))
+        self.shard_rows.append(self._row)
+        self._chunk = None
+        self._row = 0
+
+    def _to_array(self, observation, out):
+        if isinstance(observation, np.ndarray):
+            out[:] = observation
+        else:
+            self.env.state_layout.to_array(observation, out)
+        return out
+
+    def reset(self, **kwargs):
+        observation, info = self.env.reset(**kwargs)
+        self._to_array(observation, self._observation)
+        self._episode += 1
+        self._step = 0
+        return observation, info
+
+    def step(self, action):
+        assert not self._closed, "The recorder is closed."
+        self._raise_write_error()
+        observation, reward, terminated, truncated, info = self.env.step(action)
+
+        if self._chunk is None:
+            self._chunk = self._free_chunks.get()  # Blocks only while every chunk is being written
+        chunk = self._chunks[self._chunk]
+        row = self._row
+        chunk['observations'][row] = self._observation
+        chunk['actions'][row] = self.env.action_layout.decode(action)
+        chunk['flows'][row] = self.env.exchange.flows
+        self._to_array(observation, chunk['next_observations'][row])
+        chunk['rewards'][row] = reward
+        chunk['terminations'][row] = terminated
+        chunk['truncations'][row] = truncated
+        chunk['episodes'][row] = self._episode
+        chunk['steps'][row] = self._step
+        self._observation[:] = chunk['next_observations'][row]
+        self._step += 1
+        self._row += 1
+        if self._row == self.chunk_size:
+            self._flush()
+        return observation, reward, terminated, truncated, info
+
+    def close(self):
+        """
+        Writes the pending rows and the metadata, then closes the environment.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._write_error is None:
+            self._flush()
+        self._full_chunks.put(None)
+        self._writer.join()
+        if self._write_error is not None:
+            super().close()
+            raise self._write_error
+
+        env = self.env
+        meta = {
+            'observation_fields': env.state_layout.field_names,
+            'action_names': env.action_names,
+            'flow_names': env.exchange.action_names,
+            'observation_space': _box_to_dict(env.observation_space),
+            'action_space': _box_to_dict(env.action_space),
+            'columns': list(self.columns),
+            'shard_rows': self.shard_rows,
+            'episodes': self._episode + 1,
+        }
+        with open(os.path.join(self.path, self.META_FILE), 'w') as f:
+            json.dump(meta, f, indent=4)
+        super().close()
+
+
+def _box_to_dict(space: gym.spaces.Box) -> dict:
+    return {'low': space.low.tolist(), 'high': space.high.tolist(), 'dtype': space.dtype.name}
@@ -0,0 +1,109 @@
+import copy
+import random
+from typing import Any
+
+import numpy as np
+from gymnasium.vector import VectorEnv
+
+from casetta_env.casetta.scenario import compile_scenario
+from casetta_env.utils.common import get_horizon
+from casetta_env.utils.reward import RewardEngine
+from casetta_env.utils.scheduler import ModuleScheduler
+
+
+class VectorCasetta(VectorEnv):
+    """
+    Steps ``num_envs`` smart buildings at once with a single module graph.
+
+    Every module reads the previous state as columns of a ``(num_envs, len(layout))`` array and
+    keeps its per-step values as arrays of shape ``(num_envs,)``; the exchange engine routes the
+    energy of all environments with array operations. Given the same actions, each row matches an
+    independent ``Casetta`` instance. The returned observation array is owned by the environment
+    and overwritten by later steps.
+    """
+
+    def __init__(self, num_envs: int, config_path='config/config.json'):
+        self.scenario = compile_scenario(config_path)
+        self.config = self.scenario.config
+        self.modules = self.scenario.instantiate()
+        self.energy_exchange_manager = self.modules['energy_exchange']
+        self.thermal_exchange_manager = self.modules['thermal_exchange']
+        self.hot_water_exchange_manager = self.modules['hot_water_exchange']
+        self.exchange = self.modules['exchange']
+        self.building = self.modules['building']
+        self.data_source = self.building.data_source  # The copy of this environment, shared by its modules
+        self.state_modules = [self.modules[module_name] for module_name in self.scenario.state_module_names]
+
+        self.state_layout = self.scenario.state_layout
+        self.observation_index = self.state_layout.index
+        self.reward_engine = RewardEngine(self.state_layout, self.config.get('reward'))
+        self.scheduler = ModuleScheduler(self.state_modules, self.building)
+
+        single_observation_space = copy.deepcopy(self.scenario.observation_spaces[np.dtype(np.float64)])
+        single_action_space = copy.deepcopy(self.scenario.action_space)
+        self.action_layout = self.scenario.action_layout
+        self.action_names = self.action_layout.names
+        self._routing_actions = self.action_layout.routing
+        super().__init__(num_envs, single_observation_space, single_action_space)
+
+        # Double-buffered batched state, see Casetta
+        self._buffers = (np.zeros((num_envs, len(self.state_layout))), np.zeros((num_envs, len(self.state_layout))))
+        self._views = tuple(self.state_layout.view(buffer) for buffer in self._buffers)
+        self._front = 0
+        self._actions = None
+        self._needs_reset = True
+
+    def reset_wait(self, seed=None, options=None) -> tuple[np.ndarray, dict[str, Any]]:
+        if seed is not None:
+            # All environments share one module graph, hence one seed
+            seed = seed[0] if isinstance(seed, (list, tuple)) else seed
+            np.random.seed(seed)
+            random.seed(seed)
+
+        if self.data_source is not None:
+            # Episodes start at options['start_index'], or at a random offset when 'random_start' is set
+            self.data_source.start_episode(
+                get_horizon(self.config) + 1,
+                start_index=(options or {}).get('start_index'),
+                random_start=self.config['data_source'].get('random_start', False)
+            )
+        outputs = [module.reset() for module in self.state_modules]
+        self.scheduler.reset(outputs)
+        self._front = 0
+        self._needs_reset = False
+        return self.state_layout.fill(self._buffers[self._front], outputs), {}
+
+    def action_mask(self) -> np.ndarray:
+        """
+        Returns which actions can take effect from the current states, of shape ``(num_envs, n_actions)``,
+        see ``ActionLayout.feasibility_mask``.
+        """
+        assert not self._needs_reset, "Call `reset()` before `action_mask()`."
+        return self.action_layout.feasibility_mask(self._buffers[self._front])
+
+    def step_async(self, actions) -> None:
+        self._actions = actions
+
+    def step_wait(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict[str, Any]]:
+        assert not self._needs_reset, "Call `reset()` before `step()`."
+
+        actions = np.asarray(self._actions, dtype=np.float64).reshape(self.num_envs, -1)
+        action = self.action_layout.view(actions)
+
+        previous_state = self._views[self._front]
+        self.scheduler.step(previous_state, action)
+
+        self.exchange.step(previous_state, actions[:, self._routing_actions])
+
+        self._front ^= 1
+        observations = self.state_layout.fill(self._buffers[self._front], self.scheduler.get_states())
+
+        infos = {}
+        rewards = self.reward_engine.evaluate(observations, infos)
+        terminations = np.zeros(self.num_envs, dtype=bool)
+        # All environments share the building clock, so they reach the horizon together
+        truncations = np.full(self.num_envs, self.building.is_horizon_reached)
+        if self.building.is_horizon_reached:
+            infos.update({'final_observation': observations.copy(), '_final_observation': truncations})
+            observations, _ = self.reset_wait()
+        return observations, rewards, terminations, truncations, infos
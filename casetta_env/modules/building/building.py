@@ -1,41 +1,53 @@
 
 import datetime
+from itertools import accumulate
 
 import gymnasium as gym
 import numpy as np
 
 from casetta_env.modules.core.energy_consumer import EnergyConsumer
 from casetta_env.modules.core.hot_water_consumer import HotWaterConsumer
+from casetta_env.utils.common import START_DATETIME, get_calendar, get_horizon
+from casetta_env.utils.modules_factory import register_module
+from casetta_env.utils.timeseries import get_data_source
 from casetta_env.utils.types import BuildingOutput
 
 
+@register_module('building')
 class Building(EnergyConsumer, HotWaterConsumer):
     """
     Represents the building and its interaction with the environment and occupants.
     """
+    output_type = BuildingOutput
+    snapshot_fields = ('cursor', 'in_energy', 'in_hot_water')
+    supports_fast_forward = True
 
     DEFAULT_TEMP_SETPOINT = 22.0  # °C
     DEFAULT_LOAD = 2  # KWh
     DEFAULT_INTERNAL_TEMP = 20.0  # °C
+    START_DATETIME = START_DATETIME
 
-    def __init__(self, config):
+    def __init__(self, config, name=None):
         """
         Initializes the Building module with simulation time step and temperature profiles.
+        Profiles and calendar fields are precomputed for every step of the episode horizon.
+        When a data source is configured, its 'solar_irradiation', 'external_temperature',
+        'ground_temperature', 'non_shiftable_load' and 'domestic_hot_water_request' columns
+        replace the synthetic profiles.
         Args:
-            config (dict): Contains 'time_step' in minutes.
+            config (dict): Contains 'time_step' in minutes and optionally 'horizon_days' and 'data_source'.
         """
-        super().__init__(config)
+        super().__init__(config, name)
         self.time_step = config['time_step']
-        self.max_power = config['modules']['building']['max_power']
+        self.max_power = self.module_config['max_power']
         self.temperature_set_point = self.DEFAULT_TEMP_SETPOINT
-        self.hours = list(range(24))
+        self.horizon = get_horizon(config)  # Number of steps in an episode
+        self.data_source = get_data_source(config)
+        self.start_datetime = self.START_DATETIME
 
-        self.irradiance_profile = self._generate_irradiance_profile()
-        self.external_temperature_profile = self._generate_external_temperature_profile()
-        self.ground_temperature_profile = self._generate_ground_temperature_profile()
-        self.dhw_profile = self._generate_dhw_profile()
+        self._load_profiles()
 
-        self.current_datetime = None
+        self.cursor = 0  # Index of the current step in the precomputed profiles
         self.internal_temperature = None
         self.in_energy = 0.0
         self.in_hot_water = 0.0
@@ -44,6 +56,14 @@ class Building(EnergyConsumer, HotWaterConsumer):
         self._init_spaces()
         self.reset()
 
+    @property
+    def current_datetime(self):
+        return self.start_datetime + datetime.timedelta(minutes=self.cursor * self.time_step)
+
+    @property
+    def is_horizon_reached(self):
+        return self.cursor >= self.horizon
+
     def _init_spaces(self):
         min_date = datetime.date.min
         max_date = datetime.date.max
@@ -66,7 +86,8 @@ class Building(EnergyConsumer, HotWaterConsumer):
                 min_time.minute,  # minute
                 0.0,  # domestic_hot_water_request
                 0.0,  # unmet_energy_load
-                0.0  # unmet_hot_water_request
+                0.0,  # unmet_hot_water_request
+                0.0  # consumed_energy
             ]),
             high=np.array([
                 self.max_power,  # non_shiftable_load
@@ -82,14 +103,15 @@ class Building(EnergyConsumer, HotWaterConsumer):
                 max_time.hour,  # hour
                 max_time.minute,  # minute
                 100,  # domestic_hot_water_request
-                np.inf,
-                np.inf
+                np.inf,  # unmet_energy_load
+                np.inf,  # unmet_hot_water_request
+                np.inf  # consumed_energy
             ]),
         )
 
     def get_state(self):
-        self.state.unmet_energy_load = max(0, self.state.non_shiftable_load - self.in_energy)
-        self.state.unmet_hot_water_request = max(0, self.state.domestic_hot_water_request - self.in_hot_water)
+        self.state.unmet_energy_load = np.maximum(0, self.state.non_shiftable_load - self.in_energy)
+        self.state.unmet_hot_water_request = np.maximum(0, self.state.domestic_hot_water_request - self.in_hot_water)
         self.state.consumed_electric_energy = self.in_energy
         return self.state
 
@@ -104,14 +126,36 @@ class Building(EnergyConsumer, HotWaterConsumer):
     def consume_electric_energy(self, amount):
         self.in_energy += amount
 
+    def _load_profiles(self):
+        """
+        Precomputes the exogenous profiles and the calendar, one entry per step from the reset step
+        (index 0) to the last step of the horizon. With a data source these are memory-mapped
+        windows starting at the current offset of the source.
+        """
+        n_steps = self.horizon + 1
+        source = self.data_source
+        if source is not None:
+            self.start_datetime = source.start + datetime.timedelta(minutes=source.offset * self.time_step)
+        self.calendar = get_calendar(self.time_step, n_steps, source)
+        self.hours = self.calendar['hour'] + self.calendar['minute'] / 60  # Fractional hour of the day
+
+        def signal(name, generate):
+            return source.window(name, n_steps) if source is not None and name in source else generate()
+
+        self.irradiance_profile = signal('solar_irradiation', self._generate_irradiance_profile)
+        self.external_temperature_profile = signal('external_temperature', self._generate_external_temperature_profile)
+        self.ground_temperature_profile = signal('ground_temperature', self._generate_ground_temperature_profile)
+        self.load_profile = signal('non_shiftable_load', lambda: np.full(n_steps, self.DEFAULT_LOAD))
+        self.dhw_profile = signal('domestic_hot_water_request', self._generate_dhw_profile)
+
     def _generate_irradiance_profile(self):
-        return [max(0, np.sin(np.pi * (h - 6) / 12)) * 800 for h in self.hours]
+        return np.maximum(0, np.sin(np.pi * (self.hours - 6) / 12)) * 800
 
     def _generate_external_temperature_profile(self):
-        return [10 + 10 * np.sin(np.pi * (h - 6) / 12) for h in self.hours]
+        return 10 + 10 * np.sin(np.pi * (self.hours - 6) / 12)
 
     def _generate_ground_temperature_profile(self):
-        return [15 + 5 * np.sin(np.pi * (h - 6) / 12) for h in self.hours]
+        return 15 + 5 * np.sin(np.pi * (self.hours - 6) / 12)
 
     def _generate_dhw_profile(self):
         usage = [0] * 24
@@ -120,7 +164,8 @@ class Building(EnergyConsumer, HotWaterConsumer):
         usage[18:21] = [25, 35, 30]  # Evening peak
         usage[21:] = [3, 3, 1]  # Night
         usage[0:6] = [1, 1, 0, 1, 1, 1]  # Early morning
-        return usage
+        # Interpolate the hourly usage at the resolution of the time step
+        return np.interp(self.hours, np.arange(24), usage, period=24)
 
     def _update_internal_temperature(self, internal_temp, external_temp):
         """
@@ -131,9 +176,33 @@ class Building(EnergyConsumer, HotWaterConsumer):
         Returns:
             float: New internal temperature [°C].
         """
-        direction = 1 if internal_temp < external_temp else -1
-        delta = abs(external_temp - internal_temp) * 0.1  # Scaling factor
-        return internal_temp + direction * delta
+        # Move 10% of the gap towards the external temperature (works on scalars and arrays)
+        delta = (external_temp - internal_temp) * 0.1  # Scaling factor
+        return internal_temp + delta
+
+    def _output(self, internal_temp):
+        """
+        Builds the BuildingOutput of the current step from the precomputed profiles.
+        """
+        i = self.cursor
+        return BuildingOutput(
+            non_shiftable_load=self.load_profile[i],
+            internal_temperature=internal_temp,
+            external_temperature=self.external_temperature_profile[i],
+            ground_temperature=self.ground_temperature_profile[i],
+            solar_irradiation=self.irradiance_profile[i],
+            thermal_set_point=self.temperature_set_point,
+            weekday=self.calendar['weekday'][i],
+            day=self.calendar['day'][i],
+            month=self.calendar['month'][i],
+            year=self.calendar['year'][i],
+            hour=self.calendar['hour'][i],
+            minute=self.calendar['minute'][i],
+            domestic_hot_water_request=self.dhw_profile[i],
+            unmet_energy_load=0.0,  # Will be calculated in get_state
+            consumed_energy=0.0,     # Will be calculated in get_state
+            unmet_hot_water_request=0.0 # Will be calculated in get_state
+        )
 
     def step(self, state, action):
         """
@@ -144,41 +213,71 @@ class Building(EnergyConsumer, HotWaterConsumer):
         Returns:
             BuildingOutput: The output data for the current time step, including temperatures, loads, and other relevant parameters.
         """
-        # Update current_datetime based on the state from the previous step
-        self.current_datetime = datetime.datetime(
-            state.building_year, state.building_month, state.building_day,
-            state.building_hour, state.building_minute
-        ) + datetime.timedelta(minutes=self.time_step)
-
-        hour = self.current_datetime.hour
-        external_temp = self.external_temperature_profile[hour]
+        # Advance the simulation clock, which is shared by all environments of a batched state
+        assert not self.is_horizon_reached, "The episode horizon is over, call `reset()`."
+        self.cursor += 1
+
+        external_temp = self.external_temperature_profile[self.cursor]
         # Use the internal_temperature from the previous state for calculation
-        internal_temp = self._update_internal_temperature(state.building_internal_temperature, external_temp)
+        internal_temp = state.building_internal_temperature
+        if self.cursor % self.step_period == 0:
+            # With a step period, the temperature only moves at the end of every thermal step
+            internal_temp = self._update_internal_temperature(internal_temp, external_temp)
 
-        # Reset in_energy for the new step before any consumption occurs
+        # Reset the received energy and hot water for the new step before any consumption occurs
         self.in_energy = 0.0
+        self.in_hot_water = 0.0
 
         # Create a new BuildingOutput instance for the current step,
         # propagating relevant data from the previous state and updating others
-        self.state = BuildingOutput(
-            non_shiftable_load=self.DEFAULT_LOAD,
-            internal_temperature=internal_temp,
-            external_temperature=external_temp,
-            ground_temperature=self.ground_temperature_profile[hour],
-            solar_irradiation=self.irradiance_profile[hour],
+        self.state = self._output(internal_temp)
+
+    def fast_forward(self, states, action):
+        start = self.cursor
+        k = len(states.building_internal_temperature)
+        assert start + k <= self.horizon, "The episode horizon is over, call `reset()`."
+        rows = slice(start + 1, start + k + 1)
+        # The temperature relaxation is iterated on floats, which keeps it identical to stepping
+        external_temperatures = self.external_temperature_profile[rows].tolist()
+        initial = float(states.building_internal_temperature[0])
+        if self.step_period == 1:
+            update = self._update_internal_temperature
+        else:
+            external_temperatures = list(zip(range(start + 1, start + k + 1), external_temperatures))
+
+            def update(internal_temp, step):
+                cursor, external_temp = step
+                if cursor % self.step_period:
+                    return internal_temp
+                return self._update_internal_temperature(internal_temp, external_temp)
+        temperatures = np.array(list(accumulate(external_temperatures, update, initial=initial))[1:])
+        self.cursor = start + k
+        self.in_energy = 0.0
+        self.in_hot_water = 0.0
+        self.state = self._output(temperatures[-1])
+        self.get_state()
+        return BuildingOutput(
+            non_shiftable_load=self.load_profile[rows],
+            internal_temperature=temperatures,
+            external_temperature=self.external_temperature_profile[rows],
+            ground_temperature=self.ground_temperature_profile[rows],
+            solar_irradiation=self.irradiance_profile[rows],
             thermal_set_point=self.temperature_set_point,
-            weekday=self.current_datetime.weekday(),
-            day=self.current_datetime.day,
-            month=self.current_datetime.month,
-            year=self.current_datetime.year,
-            hour=hour,
-            minute=self.current_datetime.minute,
-            domestic_hot_water_request=self.dhw_profile[hour],
-            unmet_energy_load=0.0,  # Will be calculated in get_state
-            consumed_energy=0.0,     # Will be calculated in get_state
-            unmet_hot_water_request=0.0 # Will be calculated in get_state
+            weekday=self.calendar['weekday'][rows],
+            day=self.calendar['day'][rows],
+            month=self.calendar['month'][rows],
+            year=self.calendar['year'][rows],
+            hour=self.calendar['hour'][rows],
+            minute=self.calendar['minute'][rows],
+            domestic_hot_water_request=self.dhw_profile[rows],
+            unmet_energy_load=np.maximum(0, self.load_profile[rows] - self.in_energy),
+            unmet_hot_water_request=np.maximum(0, self.dhw_profile[rows] - self.in_hot_water),
+            consumed_energy=0.0
         )
 
+    def set_snapshot(self, values):
+        super().set_snapshot(values)
+        self.cursor = int(self.cursor)
 
     def reset(self) -> BuildingOutput:
         """
@@ -186,28 +285,12 @@ class Building(EnergyConsumer, HotWaterConsumer):
         Returns:
             BuildingOutput: Initial output after reset.
         """
-        self.current_datetime = datetime.datetime(2010, 1, 1, 0, 0)
+        if self.data_source is not None:
+            self._load_profiles()  # The episode may start at a new offset of the data source
+        self.cursor = 0
         self.internal_temperature = self.DEFAULT_INTERNAL_TEMP
         self.in_energy = 0.0  # Reset consumed energy on reset as well
+        self.in_hot_water = 0.0
 
-        hour = self.current_datetime.hour
-        self.state = BuildingOutput(
-            non_shiftable_load=self.DEFAULT_LOAD,
-            internal_temperature=self.internal_temperature,
-            external_temperature=self.external_temperature_profile[hour],
-            ground_temperature=self.ground_temperature_profile[hour],
-            solar_irradiation=self.irradiance_profile[hour],
-            thermal_set_point=self.temperature_set_point,
-            weekday=self.current_datetime.weekday(),
-            day=self.current_datetime.day,
-            month=self.current_datetime.month,
-            year=self.current_datetime.year,
-            hour=self.current_datetime.hour,
-            minute=self.current_datetime.minute,
-            domestic_hot_water_request=self.dhw_profile[hour],
-            unmet_energy_load=0.0,
-            consumed_energy=0.0,
-            unmet_hot_water_request=0.0
-        )
+        self.state = self._output(self.internal_temperature)
         return self.state
-
@@ -5,22 +5,28 @@ import gymnasium as gym
 
 from casetta_env.modules.core.energy_consumer import EnergyConsumer
 from casetta_env.modules.core.thermal_consumer import ThermalConsumer
+from casetta_env.utils.modules_factory import register_module
 from casetta_env.utils.types import HvacOutput
 
 
+@register_module('hvac')
 class Hvac(EnergyConsumer, ThermalConsumer):
+    output_type = HvacOutput
+    snapshot_fields = ('consumed_electric_energy', 'consumed_thermal_energy', 'current_temp', 'set_point')
+    supports_fast_forward = True
+
     def consume_thermal_energy(self, amount):
         self.consumed_thermal_energy += amount
 
-    def __init__(self, config):
-        super().__init__(config)
-        self.power_rating = config['modules']['hvac']['power_rating']
+    def __init__(self, config, name=None):
+        super().__init__(config, name)
+        self.power_rating = self.module_config['power_rating']
         self.consumed_electric_energy = 0.0
         self.current_temp = 0.0
         self.set_point = 0.0
         self.consumed_thermal_energy = 0.0
         self.observation_space = gym.spaces.Box(
-            low=np.array([0.0, -np.inf, 0.0]),
+            low=np.array([0.0, 0.0, -np.inf]),
             high=np.array([np.inf, np.inf, np.inf]),
         )
 
@@ -49,11 +55,22 @@ class Hvac(EnergyConsumer, ThermalConsumer):
         self.current_temp = state.building_internal_temperature
         self.set_point = state.building_thermal_set_point
 
+    def fast_forward(self, states, action):
+        self.consumed_electric_energy = 0.0
+        self.current_temp = states.building_internal_temperature[-1]
+        self.set_point = states.building_thermal_set_point[-1]
+        direction = 2 * (states.building_thermal_set_point >= states.building_internal_temperature) - 1
+        return HvacOutput(
+            consumed_electric_energy=0.0,
+            delta_temperature=direction * (0.0 / self.power_rating),
+            consumed_thermal_energy=self.consumed_thermal_energy
+        )
+
     def get_state(self):
         """
         Returns HvacOutput with current consumption and computed delta temperature.
         """
-        direction = 1 if self.set_point >= self.current_temp else -1
+        direction = 2 * (self.set_point >= self.current_temp) - 1  # +1 when heating, -1 when cooling
         delta_temperature = self.consumed_electric_energy / self.power_rating
 
         return HvacOutput(
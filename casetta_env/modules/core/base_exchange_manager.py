@@ -6,6 +6,10 @@ import numpy as np
 
 
 class BaseExchangeManager(ABC):
+    # Names of the methods a route calls on its producer and its consumer, see ExchangeEngine
+    produce_method = None
+    consume_method = None
+
     def __init__(self, producers, consumers, prefix=""):
         self.producers = producers
         self.consumers = consumers
@@ -15,6 +19,12 @@ class BaseExchangeManager(ABC):
         self.action_names_by_producer = {pname: [] for pname in producers}
         self.action_names_by_consumer = {cname: [] for cname in consumers}
 
+        # Routing table compiled once: for every action slot, the producer and the consumer it connects.
+        # Action names are only kept for debugging and for labelling the environment actions.
+        producer_names = list(producers)
+        consumer_names = list(consumers)
+        route_producer = []
+        route_consumer = []
         for pname in producers:
             for cname in consumers:
                 if pname != cname:
@@ -22,21 +32,48 @@ class BaseExchangeManager(ABC):
                     self.action_names.append(action_name)
                     self.action_names_by_producer[pname].append(action_name)
                     self.action_names_by_consumer[cname].append(action_name)
+                    route_producer.append(producer_names.index(pname))
+                    route_consumer.append(consumer_names.index(cname))
 
         n_actions = len(self.action_names)
+        self.route_slot = np.arange(n_actions)
+        self.route_producer = np.array(route_producer, dtype=np.intp)
+        self.route_consumer = np.array(route_consumer, dtype=np.intp)
+        self._routes = tuple(
+            (producers[producer_names[p]], consumers[consumer_names[c]])
+            for p, c in zip(route_producer, route_consumer)
+        )
+
+        # Slots of each producer, padded with a sentinel slot that points to an extra zero action,
+        # so that the per-producer totals are summed column by column in action order.
+        routes_per_producer = [np.flatnonzero(self.route_producer == p) for p in range(len(producer_names))]
+        width = max((len(slots) for slots in routes_per_producer), default=0)
+        self._producer_slots = np.full((len(producer_names), width), n_actions, dtype=np.intp)
+        for p, slots in enumerate(routes_per_producer):
+            self._producer_slots[p, :len(slots)] = slots
+
         self.action_space = gym.spaces.Box(
             low=np.zeros(n_actions, dtype=np.float32),
             high=np.ones(n_actions, dtype=np.float32)
         )
 
     def _rebalance_action(self, action):
-        rebalanced = {}
-        for producer, names in self.action_names_by_producer.items():
-            total = sum(action[name] for name in names)
-            for name in names:
-                rebalanced[name] = action[name] / total if total > 1.0 else action[name]
+        """
+        Normalizes the shares of every producer so that they sum to at most one.
 
-        return rebalanced
+        Args:
+            action (np.ndarray): Shares of each route, of shape ``(n_actions,)`` or ``(num_envs, n_actions)``.
+
+        Returns:
+            np.ndarray: The rebalanced shares, with the same shape as ``action``.
+        """
+        padded = np.concatenate([action, np.zeros(action.shape[:-1] + (1,))], axis=-1)
+        totals = padded[..., self._producer_slots[:, 0]]
+        for k in range(1, self._producer_slots.shape[1]):
+            totals = totals + padded[..., self._producer_slots[:, k]]
+        # Dividing by one leaves the value untouched, so this only rescales totals above one
+        scale = np.maximum(totals, 1.0)
+        return action / scale[..., self.route_producer]
 
     @abc.abstractmethod
     def consume_callback(self, consumer, produced):
@@ -47,12 +84,28 @@ class BaseExchangeManager(ABC):
         pass
 
     def step(self, state, action):
+        """
+        Routes the resources of every active route, in action order.
+
+        Args:
+            state: The previous state of the environment.
+            action (np.ndarray): Shares of this manager's routes, of shape ``(n_actions,)``
+                or ``(num_envs, n_actions)`` for batched environments.
+        """
+        if len(self._routes) == 0:
+            return
+
         action_rebalanced = self._rebalance_action(action)
-        for name, value in action_rebalanced.items():
-            if value > 0.0 and "_to_" in name:
-                name = name[len(self.prefix) + 1:]
-                producer_name, consumer_name = name.split('_to_')
-                producer = self.producers[producer_name]
-                consumer = self.consumers[consumer_name]
-                produced = self.produce_callback(producer, value)
-                self.consume_callback(consumer, produced)
\ No newline at end of file
+        active = action_rebalanced > 0.0
+        if action_rebalanced.ndim == 1:
+            for slot in np.flatnonzero(active):
+                producer, consumer = self._routes[slot]
+                produced = self.produce_callback(producer, action_rebalanced[slot])
+                self.consume_callback(consumer, produced)
+        else:
+            # Batched actions: route every environment at once, inactive ones with a zero flow
+            action_rebalanced = np.where(active, action_rebalanced, 0.0)
+            for slot in np.flatnonzero(active.any(axis=0)):
+                producer, consumer = self._routes[slot]
+                produced = self.produce_callback(producer, action_rebalanced[:, slot])
+                self.consume_callback(consumer, produced)
@@ -1,12 +1,39 @@
 import abc
 
+from casetta_env.utils.common import output_prefix
+
 
 class BaseModule(abc.ABC):
-    def __init__(self, config):
+    output_type = None  # Dataclass returned by reset() and get_state()
+    snapshot_fields = ()  # Numeric attributes that carry state from one step to the next
+    module_type = None  # Config type the class is registered under, see modules_factory.register_module
+    supports_fast_forward = False  # Whether fast_forward() is implemented, see Casetta.fast_forward
+
+    def __init__(self, config, name=None):
+        """
+        Args:
+            config (dict): The environment configuration.
+            name (str, optional): Key of the module in ``config['modules']``, defaults to its type.
+        """
         self.config = config
+        self.name = name or self.module_type
+        self.module_config = config['modules'].get(self.name, {})
+        # Fields of the default instance (named after its type) are prefixed with the output type,
+        # those of additional instances with their name
+        if self.output_type is not None and self.name == self.module_type:
+            self.prefix = output_prefix(self.output_type)
+        else:
+            self.prefix = self.name
+        self.step_period = int(self.module_config.get('step_period', 1))  # In base ticks, see ModuleScheduler
+        if self.step_period < 1:
+            raise ValueError(f"The step period of {self.name} must be a positive number of ticks")
         self.action_space = None
         self.observation_space = None
         self.action_names = []
+        # Fields of the state gating the exchange routes of the module, see ActionLayout.feasibility_mask():
+        # it produces only while `supply_field` is positive and consumes only while `charge_field` is below one
+        self.supply_field = None
+        self.charge_field = None
 
     @abc.abstractmethod
     def reset(self):
@@ -19,3 +46,34 @@ class BaseModule(abc.ABC):
     @abc.abstractmethod
     def get_state(self):
         pass
+
+    def fast_forward(self, states, action):
+        """
+        Advances the module by ``k`` steps in which no energy is dispatched, reaching the state that ``k`` calls
+        of ``step()`` and ``get_state()`` would. Modules with a closed form override it and set
+        ``supports_fast_forward``; for the others the environment runs the steps one by one and this default
+        does nothing.
+
+        Args:
+            states: Batched view of the ``k`` previous states, the one before each step. The building outputs
+                of all the steps are already filled in.
+            action (ActionView): The idle action.
+
+        Returns:
+            The outputs of the ``k`` steps: an ``output_type`` instance whose fields are arrays of shape ``(k,)``
+            or values shared by all the steps.
+        """
+        return None
+
+    def get_snapshot(self):
+        """
+        Returns the values of ``snapshot_fields``, the mutable state not already held by the environment state.
+        """
+        return [getattr(self, name) for name in self.snapshot_fields]
+
+    def set_snapshot(self, values):
+        """
+        Restores values returned by ``get_snapshot``.
+        """
+        for name, value in zip(self.snapshot_fields, values):
+            setattr(self, name, value)
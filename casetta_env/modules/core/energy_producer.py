@@ -8,4 +8,11 @@ class EnergyProducer(BaseModule):
     @abc.abstractmethod
     def produce_electric_energy(self, percentage):
         """Output energy based on the given percentage of the maximum capacity."""
-        pass
\ No newline at end of file
+        pass
+
+    def available_electric_energy(self, state):
+        """
+        Returns the energy a share of one would produce in the step taken from ``state``, i.e. what
+        ``produce_electric_energy(1.0)`` would return, or None when it cannot be known before routing.
+        """
+        return None
\ No newline at end of file
@@ -3,18 +3,24 @@ import gymnasium as gym
 
 from casetta_env.modules.core.energy_consumer import EnergyConsumer
 from casetta_env.modules.core.energy_producer import EnergyProducer
+from casetta_env.utils.modules_factory import register_module
 from casetta_env.utils.types import ElectricBatteryOutput
 
 
+@register_module('electric_battery')
 class ElectricBattery(EnergyProducer, EnergyConsumer):
     """
     Represents an electric battery module for energy storage and dispatch.
     """
+    output_type = ElectricBatteryOutput
+    snapshot_fields = ('stored_energy', 'soc')
+    supports_fast_forward = True
 
     def get_state(self):
         # Update stored_energy based on accumulated charged/discharged energy
         # This is where the stored_energy actually changes.
-        self.stored_energy += self.state.charged_energy - self.state.discharged_energy
+        # Not in place: in batched environments stored_energy is a column of the read-only previous state
+        self.stored_energy = self.stored_energy + (self.state.charged_energy - self.state.discharged_energy)
 
         # Ensure stored_energy stays within valid bounds (0 to capacity)
         self.stored_energy = np.clip(self.stored_energy, 0, self.capacity)
@@ -29,11 +35,15 @@ class ElectricBattery(EnergyProducer, EnergyConsumer):
             discharged_energy=self.state.discharged_energy  # Return accumulated discharged energy for this step
         )
 
-    def __init__(self, config):
-        super().__init__(config)
-        self.capacity = config['modules']['electric_battery']['capacity']  # in kWh
+    def __init__(self, config, name=None):
+        super().__init__(config, name)
+        self.capacity = self.module_config['capacity']  # in kWh
         self.soc = 0.0
         self.stored_energy = 0.0
+        self._soc_field = f"{self.prefix}_soc"  # Fields of this instance in the previous state
+        self._stored_energy_field = f"{self.prefix}_stored_energy"
+        self.supply_field = self._stored_energy_field
+        self.charge_field = self._soc_field
         self.state = ElectricBatteryOutput(
             soc=self.soc,
             stored_energy=self.stored_energy,
@@ -65,19 +75,36 @@ class ElectricBattery(EnergyProducer, EnergyConsumer):
         # Accumulate discharged energy in the state for the current step
         self.state.discharged_energy += amount_to_discharge
 
-        return amount_to_discharge if self.stored_energy > 0 else 0.0
+        # An empty battery delivers nothing (written as a product so it also applies element-wise)
+        return amount_to_discharge * (self.stored_energy > 0)
+
+    def available_electric_energy(self, state):
+        stored_energy = getattr(state, self._stored_energy_field)
+        return stored_energy * (stored_energy > 0)
 
     def consume_electric_energy(self, amount):
         # Accumulate charged energy in the state for the current step
         # Ensure we don't try to charge more than remaining capacity
-        self.state.charged_energy += min(amount, self.capacity - self.stored_energy - self.state.charged_energy)
+        self.state.charged_energy += np.minimum(amount, self.capacity - self.stored_energy - self.state.charged_energy)
+
+    def fast_forward(self, states, action):
+        # Without flows the storage holds its charge
+        self.stored_energy = np.clip(getattr(states, self._stored_energy_field)[0], 0, self.capacity)
+        self.soc = self.stored_energy / self.capacity
+        self.state = ElectricBatteryOutput(
+            soc=self.soc,
+            stored_energy=self.stored_energy,
+            charged_energy=0.0,
+            discharged_energy=0.0
+        )
+        return self.state
 
     def step(self, state, action):
         # The `state` parameter here represents the state *before* this step's actions
         self.state = ElectricBatteryOutput(
-            soc=state.electricbattery_soc,
-            stored_energy=state.electricbattery_stored_energy,
+            soc=getattr(state, self._soc_field),
+            stored_energy=getattr(state, self._stored_energy_field),
             charged_energy=0.0,  # Reset charged energy for the new step
             discharged_energy=0.0  # Reset discharged energy for the new step
         )
-        self.stored_energy = state.electricbattery_stored_energy
+        self.stored_energy = getattr(state, self._stored_energy_field)
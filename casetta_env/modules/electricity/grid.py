@@ -3,22 +3,68 @@ import numpy as np
 
 from casetta_env.modules.core.energy_consumer import EnergyConsumer
 from casetta_env.modules.core.energy_producer import EnergyProducer
+from casetta_env.utils.common import get_calendar, get_horizon
+from casetta_env.utils.modules_factory import register_module
+from casetta_env.utils.tariff import Tariff
+from casetta_env.utils.timeseries import get_data_source
 from casetta_env.utils.types import GridOutput
 
 
+@register_module('grid')
 class Grid(EnergyConsumer, EnergyProducer):
-    def __init__(self, config):
-        super().__init__(config)
+    """
+    Connection to the electricity grid, priced by a ``Tariff`` (constant prices by default).
+
+    The energy bought in the current billing period and its peak demand are carried between steps
+    for the block rates and the demand charge. The energy of a step is billed at the prices of the state
+    the action was taken from, reported in 'energy_cost', while the output shows the prices of the next step.
+    """
+    output_type = GridOutput
+    snapshot_fields = ('cursor', 'billed_energy', 'peak_demand')
+    supports_fast_forward = True
+
+    def __init__(self, config, name=None):
+        super().__init__(config, name)
         self.max_power = config['modules']['building']['max_power']  # Maximum power in kW
-        self.energy_prices = {
-            'buy': config['modules']['grid']['buy_energy'],  # $ per kWh
-            'sell': config['modules']['grid']['sell_energy'],  # $ per kWh
+        self.default_prices = {
+            'buy': self.module_config['buy_energy'],  # $ per kWh
+            'sell': self.module_config['sell_energy'],  # $ per kWh
         }
+        self.tariff = Tariff(self.module_config.get('tariff'), self.default_prices['buy'],
+                             self.default_prices['sell'])
+        self.energy_prices = dict(self.default_prices)
+        # Optional 'buy_price'/'sell_price' columns of the data source replace the constant prices
+        self.data_source = get_data_source(config)
+        self.horizon = get_horizon(config)
+        self.time_step = config['time_step']
+        self.step_hours = self.time_step / 60  # Converts the energy of a step into power
+        self._bought_field = f"{self.prefix}_bought_energy"
+        self.cursor = 0
+        self.billed_energy = 0.0  # Energy bought in the billing period before the current step [kWh]
+        self.peak_demand = 0.0  # Peak demand of the billing period before the current step [kW]
+        self._billed_prices = (0.0, 0.0)  # Buy and sell prices of the current step
         self.observation_space = gym.spaces.Box(
-            low=np.array([0.0, 0.0, 0.0, 0.0]),
-            high=np.array([100.0, 100.0, np.inf, np.inf]),
+            low=np.array([0.0, 0.0, 0.0, 0.0, 0.0, -np.inf]),
+            high=np.array([100.0, 100.0, np.inf, np.inf, np.inf, np.inf]),
         )
         self.state = None
+        self._load_price_profiles()
+
+    def _load_price_profiles(self):
+        """
+        Precomputes the prices and the billing period of every step of the episode horizon.
+        """
+        n_steps = self.horizon + 1
+        source = self.data_source
+        realtime = {}
+        if source is not None:
+            # Memory-mapped windows of the price columns starting at the episode offset
+            realtime = {
+                kind: source.window(f"{kind}_price", n_steps)
+                for kind in self.default_prices if f"{kind}_price" in source
+            }
+        calendar = get_calendar(self.time_step, n_steps, source)
+        self.price_profiles, self.billing_periods = self.tariff.price_profiles(calendar, realtime)
 
     def _update_energy_prices(self, state):
         """
@@ -26,27 +72,94 @@ class Grid(EnergyConsumer, EnergyProducer):
         :param state: the current state of the environment
         :return:
         """
-        pass
+        # Bill the energy bought in the previous step, then start over at a new billing period
+        bought = getattr(state, self._bought_field)
+        self.billed_energy = self.billed_energy + bought
+        self.peak_demand = np.maximum(self.peak_demand, bought / self.step_hours)
+        previous_cursor = self.cursor
+        # A grid with a step period moves to the end of its window
+        self.cursor = min(self.cursor + self.step_period, self.horizon)
+        if self.billing_periods[self.cursor] != self.billing_periods[previous_cursor]:
+            self.billed_energy = 0.0
+            self.peak_demand = 0.0
+        self._set_energy_prices()
+
+    def _set_energy_prices(self):
+        for kind, profile in self.price_profiles.items():
+            self.energy_prices[kind] = profile[self.cursor]
+        if self.tariff.has_blocks:
+            self.energy_prices['buy'] = self.energy_prices['buy'] + self.tariff.block_surcharge(self.billed_energy)
 
     def _reset_energy_prices(self):
         """
         Reset the energy prices to their initial values.
         :return:
         """
-        pass
+        if self.data_source is not None:
+            self._load_price_profiles()  # The episode may start at a new offset of the data source
+        self.cursor = 0
+        self.billed_energy = 0.0
+        self.peak_demand = 0.0
+        self._set_energy_prices()
+
+    def set_snapshot(self, values):
+        super().set_snapshot(values)
+        self.cursor = int(self.cursor)
+        self._set_energy_prices()
 
     def step(self, state, action) -> None:
+        # The prices shown in the state the action is taken from, before moving to the next step
+        self._billed_prices = (self.energy_prices['buy'], self.energy_prices['sell'])
         self._update_energy_prices(state)
         self.state = GridOutput(
             buy_price=self.energy_prices['buy'],
             sell_price=self.energy_prices['sell'],
             sold_energy=0.0,
-            bought_energy=0.0
+            bought_energy=0.0,
+            demand_charge=0.0,
+            energy_cost=0.0
+        )
+
+    def fast_forward(self, states, action):
+        start = self.cursor
+        k = len(getattr(states, self._bought_field))
+        bought = getattr(states, self._bought_field)[0]  # Nothing is bought after the first step
+        billing = self.billing_periods[start:start + k + 1]
+        new_period = np.cumsum(billing[1:] != billing[:-1]) > 0
+        billed_energy = np.where(new_period, 0.0, self.billed_energy + bought)
+        peak_demand = np.where(new_period, 0.0, np.maximum(self.peak_demand, bought / self.step_hours))
+        rows = slice(start + 1, start + k + 1)
+        buy_prices = self.price_profiles['buy'][rows]
+        if self.tariff.has_blocks:
+            buy_prices = buy_prices + self.tariff.block_surcharge(billed_energy)
+
+        self.cursor = start + k
+        self.billed_energy = billed_energy[-1]
+        self.peak_demand = peak_demand[-1]
+        self._set_energy_prices()
+        self.state = GridOutput(
+            buy_price=self.energy_prices['buy'],
+            sell_price=self.energy_prices['sell'],
+            sold_energy=0.0,
+            bought_energy=0.0,
+            demand_charge=0.0,
+            energy_cost=0.0
+        )
+        return GridOutput(
+            buy_price=buy_prices,
+            sell_price=self.price_profiles['sell'][rows],
+            sold_energy=0.0,
+            bought_energy=0.0,
+            demand_charge=0.0,
+            energy_cost=0.0
         )
 
     def consume_electric_energy(self, amount):
-        """Sell energy to the grid."""
-        self.state.sold_energy += amount
+        """Sell energy to the grid, up to the export cap of the step."""
+        if self.tariff.export_cap is None:
+            self.state.sold_energy += amount
+        else:
+            self.state.sold_energy = np.minimum(self.state.sold_energy + amount, self.tariff.export_cap)
 
     def produce_electric_energy(self, percentage):
         """Buy energy from the grid based on the percentage of maximum power."""
@@ -54,7 +167,16 @@ class Grid(EnergyConsumer, EnergyProducer):
         self.state.bought_energy += quantity
         return quantity
 
+    def available_electric_energy(self, state):
+        return self.max_power
+
     def get_state(self):
+        buy_price, sell_price = self._billed_prices
+        self.state.energy_cost = self.state.bought_energy * buy_price - self.state.sold_energy * sell_price
+        if self.tariff.demand_charge:
+            # Only the growth of the peak demand of the billing period is charged
+            demand = self.state.bought_energy / self.step_hours
+            self.state.demand_charge = self.tariff.demand_charge * np.maximum(demand - self.peak_demand, 0.0)
         return self.state
 
     def reset(self):
@@ -66,5 +188,7 @@ class Grid(EnergyConsumer, EnergyProducer):
             buy_price=self.energy_prices['buy'],
             sell_price=self.energy_prices['sell'],
             sold_energy=0.0,
-            bought_energy=0.0
+            bought_energy=0.0,
+            demand_charge=0.0,
+            energy_cost=0.0
         )
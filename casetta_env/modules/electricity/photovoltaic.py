@@ -1,10 +1,15 @@
 import gymnasium as gym
 
 from casetta_env.modules.core.energy_producer import EnergyProducer
+from casetta_env.utils.modules_factory import register_module
 from casetta_env.utils.types import PhotovoltaicOutput
 
 
+@register_module('photovoltaic')
 class PhotovoltaicPanel(EnergyProducer):
+    output_type = PhotovoltaicOutput
+    snapshot_fields = ('produced_energy',)
+    supports_fast_forward = True
 
     def produce_electric_energy(self, percentage):
         irradiation = self.irradiation
@@ -13,17 +18,21 @@ class PhotovoltaicPanel(EnergyProducer):
         self.produced_energy += out
         return out
 
+    def available_electric_energy(self, state):
+        return (state.building_solar_irradiation / 1000) * self.wp * self.num_modules
+
     def get_state(self):
         return PhotovoltaicOutput(
             energy_produced=self.produced_energy
         )
 
-    def __init__(self, config):
-        super().__init__(config)
-        self.num_modules = config['modules']['photovoltaic']['num_modules'] # Number of modules
-        self.wp = config['modules']['photovoltaic']['rated_power']  # Rated power in KWp
+    def __init__(self, config, name=None):
+        super().__init__(config, name)
+        self.num_modules = self.module_config['num_modules'] # Number of modules
+        self.wp = self.module_config['rated_power']  # Rated power in KWp
         self.time_step = config['time_step']  # Time step in minutes
         self.irradiation = None
+        self.supply_field = 'building_solar_irradiation'  # Nothing to produce at night
         self.observation_space = gym.spaces.Box(
             low=0.0,
             high=float('inf')
@@ -35,6 +44,13 @@ class PhotovoltaicPanel(EnergyProducer):
         self.produced_energy = 0.0
 
 
+    def fast_forward(self, states, action):
+        self.irradiation = states.building_solar_irradiation[-1]
+        self.produced_energy = 0.0
+        return PhotovoltaicOutput(
+            energy_produced=0.0
+        )
+
     def reset(self):
         """
         Reset the photovoltaic panel module to its initial state.
@@ -2,6 +2,9 @@ from casetta_env.modules.core.base_exchange_manager import BaseExchangeManager
 
 
 class EnergyExchangeManager(BaseExchangeManager):
+    produce_method = 'produce_electric_energy'
+    consume_method = 'consume_electric_energy'
+
     def consume_callback(self, consumer, produced):
         consumer.consume_electric_energy(produced)
 
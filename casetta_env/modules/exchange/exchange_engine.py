@@ -0,0 +1,142 @@
+import heapq
+
+import gymnasium as gym
+import numpy as np
+
+
+class ExchangeEngine:
+    """
+    Routes every carrier (electric energy, thermal energy, hot water) in a single pass.
+
+    The routes of all the exchange managers form one flow graph. A route feeding a module that produces
+    another carrier must run before the routes that module produces into, e.g. grid -> heat pump before
+    heat pump -> thermal storage, so the routes are dispatched in a dependency order computed once:
+    action order wherever the dependencies allow it. The shares of every producer are still normalized
+    per carrier, as by ``BaseExchangeManager``.
+
+    The engine's actions are the actions of its managers, concatenated in the given order. After every step,
+    ``flows`` holds the amount dispatched on every route, by action slot: what its producer handed to its
+    consumer, which may keep less of it (e.g. a full storage).
+    """
+
+    def __init__(self, managers):
+        """
+        Args:
+            managers (list[BaseExchangeManager]): The exchange managers, in action layout order.
+
+        Raises:
+            ValueError: If the routes depend on each other in a cycle.
+        """
+        self.managers = managers
+        self.action_names = [name for manager in managers for name in manager.action_names]
+        self.n_actions = len(self.action_names)
+        self.action_space = gym.spaces.Box(
+            low=np.zeros(self.n_actions, dtype=np.float32),
+            high=np.ones(self.n_actions, dtype=np.float32)
+        )
+
+        # Routes of all the carriers, with their action slot and producer group in the global layout
+        self.action_slices = {}
+        routes = []  # (carrier, producer, consumer) by slot
+        route_group = []
+        groups = []
+        start = 0
+        for manager in managers:
+            n_actions = len(manager.action_names)
+            self.action_slices[manager.prefix] = slice(start, start + n_actions)
+            for slot, p in zip(manager.route_slot, manager.route_producer):
+                producer, consumer = manager._routes[slot]
+                routes.append((manager, producer, consumer))
+                route_group.append(len(groups) + p)
+            for slots in manager._producer_slots:
+                groups.append([start + s if s < n_actions else self.n_actions for s in slots])
+            start += n_actions
+        self.route_group = np.array(route_group, dtype=np.intp)
+        width = max((len(slots) for slots in groups), default=0)
+        self._group_slots = np.full((len(groups), width), self.n_actions, dtype=np.intp)
+        for g, slots in enumerate(groups):
+            self._group_slots[g, :len(slots)] = slots
+
+        self.route_order = self._dependency_order(routes)
+        self.routes = [(slot,) + routes[slot] for slot in self.route_order]
+        # Bound produce/consume methods, so that dispatching a route is two calls
+        self._dispatch = tuple(
+            (slot, getattr(producer, manager.produce_method), getattr(consumer, manager.consume_method))
+            for slot, manager, producer, consumer in self.routes
+        )
+        self.flows = np.zeros(self.n_actions)  # Replaced (never written in place) at every step
+
+    @staticmethod
+    def _dependency_order(routes):
+        """
+        Sorts the route slots so that every route consuming into a module runs before the routes of the
+        other carriers produced by that module, keeping action order among independent routes.
+        """
+        successors = [[] for _ in routes]
+        n_dependencies = [0] * len(routes)
+        for first, (manager, _, consumer) in enumerate(routes):
+            for second, (other_manager, producer, _) in enumerate(routes):
+                if producer is consumer and other_manager is not manager:
+                    successors[first].append(second)
+                    n_dependencies[second] += 1
+        ready = [slot for slot, n in enumerate(n_dependencies) if n == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            slot = heapq.heappop(ready)
+            order.append(slot)
+            for successor in successors[slot]:
+                n_dependencies[successor] -= 1
+                if n_dependencies[successor] == 0:
+                    heapq.heappush(ready, successor)
+        if len(order) != len(routes):
+            raise ValueError("The exchange routes depend on each other in a cycle")
+        return np.array(order, dtype=np.intp)
+
+    def _rebalance_action(self, action):
+        """
+        Normalizes the shares of every producer of every carrier so that they sum to at most one.
+
+        Args:
+            action (np.ndarray): Shares of each route, of shape ``(n_actions,)`` or ``(num_envs, n_actions)``.
+
+        Returns:
+            np.ndarray: The rebalanced shares, with the same shape as ``action``.
+        """
+        padded = np.concatenate([action, np.zeros(action.shape[:-1] + (1,))], axis=-1)
+        totals = padded[..., self._group_slots[:, 0]]
+        for k in range(1, self._group_slots.shape[1]):
+            totals = totals + padded[..., self._group_slots[:, k]]
+        scale = np.maximum(totals, 1.0)
+        return action / scale[..., self.route_group]
+
+    def step(self, state, action):
+        """
+        Routes the resources of every active route of every carrier, in dependency order.
+
+        Args:
+            state: The previous state of the environment.
+            action (np.ndarray): Shares of the routes, of shape ``(n_actions,)``
+                or ``(num_envs, n_actions)`` for batched environments.
+        """
+        if self.n_actions == 0:
+            return
+
+        action_rebalanced = self._rebalance_action(action)
+        active = action_rebalanced > 0.0
+        flows = np.zeros(action_rebalanced.shape)
+        if action_rebalanced.ndim == 1:
+            active = active[self.route_order]
+            for i in np.flatnonzero(active):
+                slot, produce, consume = self._dispatch[i]
+                flows[slot] = produced = produce(action_rebalanced[slot])
+                consume(produced)
+        else:
+            # Batched actions: route every environment at once, inactive ones with a zero flow
+            action_rebalanced = np.where(active, action_rebalanced, 0.0)
+            active = active.any(axis=0)[self.route_order]
+            for i in np.flatnonzero(active):
+                slot, produce, consume = self._dispatch[i]
+                flows[:, slot] = produced = produce(action_rebalanced[:, slot])
+                consume(produced)
+        self.flows = flows
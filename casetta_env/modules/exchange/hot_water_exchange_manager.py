@@ -2,6 +2,9 @@ from casetta_env.modules.core.base_exchange_manager import BaseExchangeManager
 
 
 class HotWaterExchangeManager(BaseExchangeManager):
+    produce_method = 'produce_hot_water'
+    consume_method = 'consume_hot_water'
+
     def consume_callback(self, consumer, produced):
         consumer.consume_hot_water(produced)
 
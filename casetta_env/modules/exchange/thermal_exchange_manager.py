@@ -2,6 +2,9 @@ from casetta_env.modules.core.base_exchange_manager import BaseExchangeManager
 
 
 class ThermalExchangeManager(BaseExchangeManager):
+    produce_method = 'produce_thermal_energy'
+    consume_method = 'consume_thermal_energy'
+
     def consume_callback(self, consumer, produced):
         consumer.consume_thermal_energy(produced)
 
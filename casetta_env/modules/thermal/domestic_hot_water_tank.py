@@ -5,13 +5,19 @@ import gymnasium as gym
 
 from casetta_env.modules.core.hot_water_producer import HotWaterProducer
 from casetta_env.modules.core.thermal_consumer import ThermalConsumer
+from casetta_env.utils.modules_factory import register_module
 from casetta_env.utils.types import DomesticHotWaterTankOutput
 
 
+@register_module('dhw_tank')
 class DomesticHotWaterTank(ThermalConsumer, HotWaterProducer):
+    output_type = DomesticHotWaterTankOutput
+    snapshot_fields = ('stored_water', 'soc')
+    supports_fast_forward = True
+
     def consume_thermal_energy(self, amount):
         charged_water = self._thermal_energy_to_liters(self.state.charged_energy)
-        self.state.charged_energy += min(amount, self.capacity - self.stored_water - charged_water)
+        self.state.charged_energy += np.minimum(amount, self.capacity - self.stored_water - charged_water)
 
     def _thermal_energy_to_liters(self, energy_kJ):
         # Assuming 1 liter of water requires 4.186 kJ to raise by 1°C (specific heat capacity)
@@ -35,15 +41,29 @@ class DomesticHotWaterTank(ThermalConsumer, HotWaterProducer):
 
     def step(self, state, action):
         self.state = DomesticHotWaterTankOutput(
-            soc=state.domestichotwatertank_soc,
-            stored_water=state.domestichotwatertank_stored_water,
+            soc=getattr(state, self._soc_field),
+            stored_water=getattr(state, self._stored_water_field),
             charged_energy=0.0,  # Reset charged energy for the new step
             discharged_water=0.0  # Reset discharged energy for the new step
         )
-        self.stored_water = state.domestichotwatertank_stored_water
+        self.stored_water = getattr(state, self._stored_water_field)
+
+    def fast_forward(self, states, action):
+        # Without flows the tank holds its water
+        self.stored_water = np.clip(getattr(states, self._stored_water_field)[0], 0, self.capacity)
+        self.soc = self.stored_water / self.capacity
+        self.state = DomesticHotWaterTankOutput(
+            soc=self.soc,
+            stored_water=self.stored_water,
+            charged_energy=0.0,
+            discharged_water=0.0
+        )
+        return self.state
 
     def get_state(self):
-        self.stored_water += self._thermal_energy_to_liters(self.state.charged_energy) - self.state.discharged_water
+        # Not in place: in batched environments stored_water is a column of the read-only previous state
+        self.stored_water = self.stored_water + (
+            self._thermal_energy_to_liters(self.state.charged_energy) - self.state.discharged_water)
 
         # Ensure stored_energy stays within valid bounds (0 to capacity)
         self.stored_water = np.clip(self.stored_water, 0, self.capacity)
@@ -54,25 +74,27 @@ class DomesticHotWaterTank(ThermalConsumer, HotWaterProducer):
         return DomesticHotWaterTankOutput(
             soc=self.soc,
             stored_water=self.stored_water,
-            charged_energy=0.0,  # Reset charged water for the new step
-            discharged_water=0.0  # Reset discharged water for the new step
+            charged_energy=self.state.charged_energy,  # Return accumulated charged energy for this step
+            discharged_water=self.state.discharged_water  # Return accumulated discharged water for this step
         )
 
     def produce_hot_water(self, percentage):
         amount_to_discharge = self.stored_water * percentage
-        self.discharged_water += amount_to_discharge
+        self.state.discharged_water += amount_to_discharge
 
         return amount_to_discharge
 
-    def __init__(self, config):
-        super().__init__(config)
+    def __init__(self, config, name=None):
+        super().__init__(config, name)
         self.state = None
         self.soc = 0.0  # State of charge (0 to 1)
         self.stored_water = 0.0
-        self.charged_energy = 0.0
-        self.discharged_water = 0.0
-        self.capacity = config['modules']['dhw_tank']['capacity']  # in L
+        self._soc_field = f"{self.prefix}_soc"  # Fields of this instance in the previous state
+        self._stored_water_field = f"{self.prefix}_stored_water"
+        self.supply_field = self._stored_water_field
+        self.charge_field = self._soc_field
+        self.capacity = self.module_config['capacity']  # in L
         self.observation_space = gym.spaces.Box(
             low=np.array([0.0, 0.0, 0.0, 0.0]),
-            high=np.array([1.0, self.capacity, np.inf, np.inf]),
+            high=np.array([1.0, np.inf, np.inf, self.capacity]),
         )
\ No newline at end of file
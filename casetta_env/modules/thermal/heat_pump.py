@@ -5,10 +5,16 @@ import gymnasium as gym
 
 from casetta_env.modules.core.energy_consumer import EnergyConsumer
 from casetta_env.modules.core.thermal_producer import ThermalProducer
+from casetta_env.utils.modules_factory import register_module
 from casetta_env.utils.types import HeatPumpOutput
 
 
+@register_module('heat_pump')
 class HeatPump(EnergyConsumer, ThermalProducer):
+    output_type = HeatPumpOutput
+    snapshot_fields = ('consumed_electric_energy',)
+    supports_fast_forward = True
+
     def produce_thermal_energy(self, percentage):
         return percentage * (self.consumed_electric_energy / self.power_rating)
 
@@ -22,11 +28,22 @@ class HeatPump(EnergyConsumer, ThermalProducer):
         )
 
     def step(self, state, action):
-        source = round(action['source'])  # 'air', 'ground'
+        source = np.round(action['source'])  # 'air', 'ground'
         ground_temperature = state.building_ground_temperature
         air_temperature = state.building_external_temperature
-        self.input_temperature = ground_temperature if source == 0 else air_temperature
+        self.input_temperature = np.where(source == 0, ground_temperature, air_temperature)
+        self.consumed_electric_energy = 0.0
+
+    def fast_forward(self, states, action):
+        source = np.round(action['source'])
+        self.input_temperature = np.where(
+            source == 0, states.building_ground_temperature[-1], states.building_external_temperature[-1]
+        )
         self.consumed_electric_energy = 0.0
+        return HeatPumpOutput(
+            consumed_electric_energy=0.0,
+            produced_thermal_energy=0.0
+        )
 
     def get_state(self):
         return HeatPumpOutput(
@@ -34,9 +51,9 @@ class HeatPump(EnergyConsumer, ThermalProducer):
             produced_thermal_energy=self.consumed_electric_energy / self.power_rating
         )
 
-    def __init__(self, config):
-        super().__init__(config)
-        self.power_rating = config['modules']['heat_pump']['power_rating']  # kW
+    def __init__(self, config, name=None):
+        super().__init__(config, name)
+        self.power_rating = self.module_config['power_rating']  # kW
         self.input_temperature = None
         self.consumed_electric_energy = 0.0
         self.observation_space = gym.spaces.Box(
@@ -3,16 +3,21 @@ import gymnasium as gym
 
 from casetta_env.modules.core.thermal_consumer import ThermalConsumer
 from casetta_env.modules.core.thermal_producer import ThermalProducer
+from casetta_env.utils.modules_factory import register_module
 from casetta_env.utils.types import ThermalEnergyStorageOutput
 
 
+@register_module('thermal_storage')
 class ThermalEnergyStorage(ThermalConsumer, ThermalProducer):
     """
     Class representing a thermal energy storage system.
     """
+    output_type = ThermalEnergyStorageOutput
+    snapshot_fields = ('stored_energy', 'soc')
+    supports_fast_forward = True
 
     def consume_thermal_energy(self, amount):
-        self.state.charged_energy += min(amount, self.capacity - self.stored_energy - self.state.charged_energy)
+        self.state.charged_energy += np.minimum(amount, self.capacity - self.stored_energy - self.state.charged_energy)
 
     def produce_thermal_energy(self, percentage):
         # Calculate amount to discharge based on current stored_energy
@@ -36,17 +41,30 @@ class ThermalEnergyStorage(ThermalConsumer, ThermalProducer):
         )
         return self.state
 
+    def fast_forward(self, states, action):
+        # Without flows the storage holds its charge
+        self.stored_energy = np.clip(getattr(states, self._stored_energy_field)[0], 0, self.capacity)
+        self.soc = self.stored_energy / self.capacity
+        self.state = ThermalEnergyStorageOutput(
+            soc=self.soc,
+            stored_energy=self.stored_energy,
+            charged_energy=0.0,
+            discharged_energy=0.0
+        )
+        return self.state
+
     def step(self, state, action):
         self.state = ThermalEnergyStorageOutput(
-            soc=state.thermalenergystorage_soc,
-            stored_energy=state.thermalenergystorage_stored_energy,
+            soc=getattr(state, self._soc_field),
+            stored_energy=getattr(state, self._stored_energy_field),
             charged_energy=0.0,  # Reset charged energy for the new step
             discharged_energy=0.0  # Reset discharged energy for the new step
         )
-        self.stored_energy = state.thermalenergystorage_stored_energy
+        self.stored_energy = getattr(state, self._stored_energy_field)
 
     def get_state(self):
-        self.stored_energy += self.state.charged_energy - self.state.discharged_energy
+        # Not in place: in batched environments stored_energy is a column of the read-only previous state
+        self.stored_energy = self.stored_energy + (self.state.charged_energy - self.state.discharged_energy)
 
         # Ensure stored_energy stays within valid bounds (0 to capacity)
         self.stored_energy = np.clip(self.stored_energy, 0, self.capacity)
@@ -61,11 +79,15 @@ class ThermalEnergyStorage(ThermalConsumer, ThermalProducer):
             discharged_energy=self.state.discharged_energy  # Return accumulated discharged energy for this step
         )
 
-    def __init__(self, config):
-        super().__init__(config)
-        self.capacity = config['modules']['thermal_storage']['capacity'] # kJ
+    def __init__(self, config, name=None):
+        super().__init__(config, name)
+        self.capacity = self.module_config['capacity'] # kJ
         self.stored_energy = 0.0
         self.soc = 0.0
+        self._soc_field = f"{self.prefix}_soc"  # Fields of this instance in the previous state
+        self._stored_energy_field = f"{self.prefix}_stored_energy"
+        self.supply_field = self._stored_energy_field
+        self.charge_field = self._soc_field
         self.state = None
         self.state = ThermalEnergyStorageOutput(
             soc=self.soc,
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class ActionView:
+    """
+    Read-only access to a flat action by name, e.g. ``action['source']``, handed to the modules instead of a
+    dict. The fields of a batched action of shape ``(num_envs, n_actions)`` are columns of shape ``(num_envs,)``.
+    """
+
+    __slots__ = ('_data', '_index')
+
+    def __init__(self, data, index):
+        self._data = data
+        self._index = index
+
+    def __getitem__(self, name):
+        return self._data[..., self._index[name]]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def keys(self):
+        return self._index.keys()
+
+
+class ActionLayout:
+    """
+    Fixed layout of the flat action: the exchange routes of every carrier, then the module actions.
+    It is computed once per environment, so that actions are decoded by position (slices per carrier,
+    indices per name) instead of being converted to a dict at every step.
+
+    It also precompiles the routes that cannot move anything in a given state, see ``feasibility_mask()``.
+    """
+
+    def __init__(self, exchange, state_layout, module_actions=('source',)):
+        """
+        Args:
+            exchange (ExchangeEngine): The exchange engine, whose actions come first.
+            state_layout (StateLayout): Layout of the flat state the feasibility mask is computed from.
+            module_actions (tuple[str, ...]): Names of the actions read by the modules, after the routes.
+        """
+        self.names = exchange.action_names + list(module_actions)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.slices = dict(exchange.action_slices)  # Routes of every carrier
+        self.routing = slice(0, exchange.n_actions)
+
+        # Routes gated by a field of their producer (nothing left to supply) or of their consumer (full)
+        supply_routes, supply_fields, charge_routes, charge_fields = [], [], [], []
+        for slot, _, producer, consumer in exchange.routes:
+            if producer.supply_field is not None:
+                supply_routes.append(slot)
+                supply_fields.append(state_layout.index[producer.supply_field])
+            if consumer.charge_field is not None:
+                charge_routes.append(slot)
+                charge_fields.append(state_layout.index[consumer.charge_field])
+        self._supply_routes = np.array(supply_routes, dtype=np.intp)
+        self._supply_fields = np.array(supply_fields, dtype=np.intp)
+        self._charge_routes = np.array(charge_routes, dtype=np.intp)
+        self._charge_fields = np.array(charge_fields, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.names)
+
+    def decode(self, action):
+        """
+        Returns an action given as a dict of values by name, or as an array, as a float64 array.
+        """
+        if isinstance(action, dict):
+            return np.array([action[name] for name in self.names], dtype=np.float64).T
+        return np.asarray(action, dtype=np.float64)
+
+    def view(self, action):
+        """
+        Returns a by-name view of a flat action of shape ``(n_actions,)`` or ``(num_envs, n_actions)``.
+        """
+        return ActionView(action, self.index)
+
+    def feasibility_mask(self, state):
+        """
+        Returns which actions can take effect in a state: routes whose producer has nothing to supply
+        (e.g. an empty battery or tank) or whose consumer is full are False, every other action is True.
+
+        Args:
+            state (np.ndarray): Flat state of shape ``(len(state_layout),)`` or ``(num_envs, len(state_layout))``.
+
+        Returns:
+            np.ndarray: A boolean mask of shape ``state.shape[:-1] + (n_actions,)``.
+        """
+        state = np.asarray(state)
+        mask = np.ones(state.shape[:-1] + (len(self.names),), dtype=bool)
+        mask[..., self._supply_routes] = state[..., self._supply_fields] > 0.0
+        # A route gated at both ends needs both
+        mask[..., self._charge_routes] &= state[..., self._charge_fields] < 1.0
+        return mask
@@ -1,3 +1,10 @@
+import copy
+import datetime
+import json
+import os
+from functools import lru_cache
+from operator import attrgetter
+
 import numpy as np
 from gymnasium.spaces import Box
 
@@ -5,11 +12,219 @@ from gymnasium.spaces import Box
 from dataclasses import dataclass, field, fields, make_dataclass, MISSING, is_dataclass
 from typing import Any
 
+
+def output_prefix(output_type: type) -> str:
+    """
+    Returns the field prefix used for a module output dataclass in the merged state
+    (e.g. ``ElectricBatteryOutput`` -> ``electricbattery``).
+
+    Args:
+        output_type (type): The module output dataclass type.
+
+    Returns:
+        str: The lower-case prefix.
+    """
+    return output_type.__name__.split('Output')[0].lower()
+
+
+def _tuple_getter(names: list[str]):
+    """
+    Returns a callable extracting the given attributes from an object as a tuple,
+    also when a single attribute is requested.
+    """
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return lambda obj: (getter(obj),)
+    return getter
+
+
+class StateLayout:
+    """
+    Fixed layout of a merged state: the merged dataclass type, its field order and the
+    mapping from merged field names to module prefixes. It is computed once per combination
+    of module outputs and reused to build states with a handful of attribute reads.
+    """
+
+    def __init__(self, name: str, output_types: tuple[type, ...], prefixes: tuple[str, ...] = None):
+        """
+        Args:
+            name (str): Name of the merged dataclass.
+            output_types (tuple[type, ...]): Module output dataclass types, in merge order.
+            prefixes (tuple[str, ...], optional): Field prefix of each output, defaults to ``output_prefix``.
+        """
+        if prefixes is None:
+            prefixes = tuple(output_prefix(output_type) for output_type in output_types)
+        if len(set(prefixes)) != len(prefixes):
+            raise ValueError(f"Duplicate field prefixes in the merged state: {prefixes}")
+        self.name = name
+        self.output_types = output_types
+        self.prefixes = []
+        self.field_names = []
+        self.prefix_map = {}  # merged field name -> (prefix, module field name)
+        self.index = {}  # merged field name -> position in the flat state
+        self.slices = []  # position of each module output inside the merged state
+
+        new_fields = []
+        getters = []
+        for output_type, prefix in zip(output_types, prefixes):
+            if not is_dataclass(output_type):
+                raise TypeError(f"{output_type} is not a dataclass")
+
+            start = len(self.field_names)
+            names = []
+            for f in fields(output_type):
+                new_name = f"{prefix}_{f.name}"
+
+                # Handle default values
+                if f.default is not MISSING:
+                    new_fields.append((new_name, f.type, f.default))
+                elif f.default_factory is not MISSING:  # type: ignore
+                    new_fields.append((new_name, f.type, field(default_factory=f.default_factory)))  # type: ignore
+                else:
+                    new_fields.append((new_name, f.type))
+
+                self.index[new_name] = len(self.field_names)
+                self.field_names.append(new_name)
+                self.prefix_map[new_name] = (prefix, f.name)
+                names.append(f.name)
+
+            self.prefixes.append(prefix)
+            self.slices.append(slice(start, len(self.field_names)))
+            getters.append(_tuple_getter(names))
+
+        # Frozen, so the previous state handed to modules is read-only and can be shared without copying
+        self.cls = make_dataclass(name, new_fields, slots=True, frozen=True)
+        self.int_fields = tuple(i for i, (_, field_type, *_) in enumerate(new_fields) if field_type is int)
+        self._values_getter = _tuple_getter(self.field_names)
+        self.view_cls = self._make_view_cls(name, new_fields)
+        self.batched_view_cls = self._make_view_cls(f"Batched{name}", new_fields, batched=True)
+        self._getters = tuple(getters)
+        self._fillers = tuple(zip(self.slices, getters))
+
+    def __len__(self):
+        return len(self.field_names)
+
+    @staticmethod
+    def _make_view_cls(name: str, new_fields: list[tuple], batched: bool = False) -> type:
+        """
+        Creates a read-only class exposing the merged fields as attributes of a flat buffer,
+        so that modules can read a flat state exactly like a merged dataclass instance.
+        Batched views read columns of a ``(num_envs, len(layout))`` buffer.
+        """
+        attributes = {'__slots__': ('_data',)}
+        for position, (field_name, field_type, *_) in enumerate(new_fields):
+            if batched and field_type is int:
+                attributes[field_name] = property(lambda self, i=position: self._data[:, i].astype(np.int64))
+            elif batched:
+                attributes[field_name] = property(lambda self, i=position: self._data[:, i])
+            elif field_type is int:
+                attributes[field_name] = property(lambda self, i=position: int(self._data[i]))
+            else:
+                attributes[field_name] = property(lambda self, i=position: self._data[i])
+
+        def __init__(self, data):
+            self._data = data
+
+        attributes['__init__'] = __init__
+        return type(f"{name}View", (), attributes)
+
+    def merge(self, instances: list[Any]) -> Any:
+        """
+        Builds a merged state instance from module outputs laid out as ``output_types``.
+
+        Args:
+            instances (list): Module output dataclass instances, in layout order.
+
+        Returns:
+            Any: An instance of the merged dataclass.
+        """
+        values = []
+        for getter, obj in zip(self._getters, instances):
+            values.extend(getter(obj))
+        return self.cls(*values)
+
+    def fill(self, buffer: np.ndarray, instances: list[Any]) -> np.ndarray:
+        """
+        Writes module outputs laid out as ``output_types`` into their slices of a flat buffer.
+
+        Args:
+            buffer (np.ndarray): Preallocated buffer of shape ``(len(self),)``, or ``(num_envs, len(self))``
+                for batched outputs whose fields are scalars or arrays of shape ``(num_envs,)``.
+            instances (list): Module output dataclass instances, in layout order.
+
+        Returns:
+            np.ndarray: The filled buffer.
+        """
+        if buffer.ndim == 1:
+            for (sl, getter), obj in zip(self._fillers, instances):
+                buffer[sl] = getter(obj)
+        else:
+            for (sl, getter), obj in zip(self._fillers, instances):
+                for column, value in zip(range(sl.start, sl.stop), getter(obj)):
+                    buffer[:, column] = value
+        return buffer
+
+    def fill_output(self, buffer: np.ndarray, position: int, instance: Any) -> None:
+        """
+        Writes the output of the module at ``position`` of the layout into a ``(n, len(self))`` buffer,
+        whose fields are scalars or arrays of shape ``(n,)``.
+        """
+        sl, getter = self._fillers[position]
+        for column, value in zip(range(sl.start, sl.stop), getter(instance)):
+            buffer[:, column] = value
+
+    def to_array(self, state: Any, out: np.ndarray) -> np.ndarray:
+        """
+        Writes the values of a merged state instance into a flat buffer.
+        """
+        out[:] = self._values_getter(state)
+        return out
+
+    def from_array(self, values: np.ndarray) -> Any:
+        """
+        Builds a merged state instance from a flat buffer, restoring integer fields.
+        """
+        values = values.tolist()
+        for i in self.int_fields:
+            values[i] = int(values[i])
+        return self.cls(*values)
+
+    def split(self, values: np.ndarray) -> list[Any]:
+        """
+        Builds the module output instances of a flat state, restoring integer fields.
+        """
+        values = values.tolist()
+        for i in self.int_fields:
+            values[i] = int(values[i])
+        return [output_type(*values[sl]) for output_type, sl in zip(self.output_types, self.slices)]
+
+    def view(self, buffer: np.ndarray) -> Any:
+        """
+        Returns a read-only attribute view over a flat (or batched) buffer laid out as this state.
+        The buffer stays writable, but the columns returned by a batched view cannot be written through.
+        """
+        data = buffer.view()
+        data.flags.writeable = False
+        if buffer.ndim == 1:
+            return self.view_cls(data)
+        return self.batched_view_cls(data)
+
+
+@lru_cache(maxsize=None)
+def get_state_layout(name: str, output_types: tuple[type, ...], prefixes: tuple[str, ...] = None) -> StateLayout:
+    """
+    Returns the cached StateLayout for the given name, module output types and field prefixes.
+    """
+    return StateLayout(name, output_types, prefixes)
+
+
 def merge_dataclasses(name: str, instances: list[Any]) -> Any:
     """
     Merges multiple dataclass instances into a new dataclass instance
     with all combined fields and their values.
 
+    The merged type is built once per combination of instance types and cached.
+
     Args:
         name (str): Name of the new merged dataclass.
         instances (list): List of dataclass instances to merge.
@@ -17,39 +232,92 @@ def merge_dataclasses(name: str, instances: list[Any]) -> Any:
     Returns:
         Any: A new dataclass instance with combined fields and values.
     """
-    new_fields = []
-    new_values = {}
-
     for obj in instances:
-        if not is_dataclass(obj):
+        if not is_dataclass(obj) or isinstance(obj, type):
             raise TypeError(f"{obj} is not a dataclass instance")
 
-        for f in fields(obj):
-            new_name = f"{str(obj).split('Output(')[0].lower()}_{f.name}"  # Prefix with the class name
+    layout = get_state_layout(name, tuple(type(obj) for obj in instances))
+    return layout.merge(instances)
+
+
+DEFAULT_HORIZON_DAYS = 365
 
-            # Handle default values
-            if f.default is not MISSING:
-                new_fields.append((new_name, f.type, f.default))
-            elif f.default_factory is not MISSING:  # type: ignore
-                new_fields.append((new_name, f.type, field(default_factory=f.default_factory)))  # type: ignore
-            else:
-                new_fields.append((new_name, f.type))
 
-            new_values[new_name] = getattr(obj, f.name)
+def get_horizon(config: dict) -> int:
+    """
+    Returns the number of steps of an episode, from the 'horizon_days' and 'time_step' config keys.
+    """
+    return config.get('horizon_days', DEFAULT_HORIZON_DAYS) * 24 * 60 // config['time_step']
 
-    # Create the new dataclass type
-    Combined = make_dataclass(name, new_fields)
 
-    # Instantiate it with merged values
-    return Combined(**new_values)
+START_DATETIME = datetime.datetime(2010, 1, 1, 0, 0)  # Step 0 of the synthetic calendar
+
+
+def make_calendar(start: datetime.datetime, time_step: int, n_steps: int) -> dict[str, np.ndarray]:
+    """
+    Computes the calendar fields of every simulation step.
+
+    Args:
+        start (datetime.datetime): Date and time of step 0.
+        time_step (int): Step length in minutes.
+        n_steps (int): Number of steps.
+
+    Returns:
+        dict[str, np.ndarray]: Integer arrays of length ``n_steps`` for
+        'weekday' (Monday is 0), 'day', 'month', 'year', 'hour' and 'minute'.
+    """
+    timestamps = np.datetime64(start, 'm') + np.arange(n_steps) * np.timedelta64(time_step, 'm')
+    days = timestamps.astype('datetime64[D]')
+    months = timestamps.astype('datetime64[M]')
+    minute_of_day = (timestamps - days).astype(np.int64)
+    return {
+        'weekday': (days.astype(np.int64) + 3) % 7,  # 1970-01-01 was a Thursday
+        'day': (days - months).astype(np.int64) + 1,
+        'month': months.astype(np.int64) % 12 + 1,
+        'year': timestamps.astype('datetime64[Y]').astype(np.int64) + 1970,
+        'hour': minute_of_day // 60,
+        'minute': minute_of_day % 60,
+    }
+
+
+def get_calendar(time_step: int, n_steps: int, data_source=None) -> dict[str, np.ndarray]:
+    """
+    Returns the calendar of the next ``n_steps`` steps of the episode: memory-mapped windows starting at the
+    current offset of the data source when there is one, the synthetic calendar starting at
+    ``START_DATETIME`` otherwise (see ``make_calendar``).
+    """
+    if data_source is None:
+        return make_calendar(START_DATETIME, time_step, n_steps)
+    return {name: data_source.window(name, n_steps) for name in data_source.CALENDAR_COLUMNS}
+
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'casetta')
+
+
+def load_config(config_path: str | dict) -> dict:
+    """
+    Loads a scenario configuration, resolving the path like Casetta does.
+
+    Args:
+        config_path (str | dict): Path of the JSON config, absolute or relative to the ``casetta_env/casetta``
+            directory of the package (whatever the working directory), or the config itself.
+
+    Returns:
+        dict: The parsed configuration, a copy when a config is given.
+    """
+    if isinstance(config_path, dict):
+        return copy.deepcopy(config_path)
+    with open(os.path.join(CONFIG_DIR, config_path)) as f:
+        return json.load(f)
 
 
-def merge_box_spaces(spaces: list[Box]) -> Box:
+def merge_box_spaces(spaces: list[Box], dtype=np.float32) -> Box:
     """
     Merge a list of gym.spaces.Box into a single Box space.
 
     Args:
         spaces (list[Box]): List of Box spaces to merge.
+        dtype: Data type of the merged space.
 
     Returns:
         Box: A new Box space with concatenated bounds and shape.
@@ -57,4 +325,4 @@ def merge_box_spaces(spaces: list[Box]) -> Box:
     low = np.concatenate([space.low.flatten() for space in spaces])
     high = np.concatenate([space.high.flatten() for space in spaces])
 
-    return Box(low=low, high=high)
\ No newline at end of file
+    return Box(low=low, high=high, dtype=dtype)
@@ -1,84 +1,128 @@
-from casetta_env.modules.building.building import Building
-from casetta_env.modules.building.hvac import Hvac
+import importlib
+from functools import lru_cache
+from importlib.metadata import entry_points
+
 from casetta_env.modules.core.energy_consumer import EnergyConsumer
 from casetta_env.modules.core.energy_producer import EnergyProducer
 from casetta_env.modules.core.hot_water_consumer import HotWaterConsumer
 from casetta_env.modules.core.hot_water_producer import HotWaterProducer
 from casetta_env.modules.core.thermal_consumer import ThermalConsumer
 from casetta_env.modules.core.thermal_producer import ThermalProducer
-from casetta_env.modules.electricity.electric_battery import ElectricBattery
-from casetta_env.modules.electricity.grid import Grid
-from casetta_env.modules.electricity.photovoltaic import PhotovoltaicPanel
 from casetta_env.modules.exchange.energy_exchange_manager import EnergyExchangeManager
+from casetta_env.modules.exchange.exchange_engine import ExchangeEngine
 from casetta_env.modules.exchange.hot_water_exchange_manager import HotWaterExchangeManager
 from casetta_env.modules.exchange.thermal_exchange_manager import ThermalExchangeManager
-from casetta_env.modules.thermal.domestic_hot_water_tank import DomesticHotWaterTank
-from casetta_env.modules.thermal.heat_pump import HeatPump
-from casetta_env.modules.thermal.thermal_energy_storage import ThermalEnergyStorage
+
+# Module classes by config type. Built-in classes are listed as "module:Class" paths and imported the
+# first time a config uses them; importing a class decorated with register_module replaces its path.
+MODULE_CLASSES = {
+    'grid': 'casetta_env.modules.electricity.grid:Grid',
+    'electric_battery': 'casetta_env.modules.electricity.electric_battery:ElectricBattery',
+    'building': 'casetta_env.modules.building.building:Building',
+    'photovoltaic': 'casetta_env.modules.electricity.photovoltaic:PhotovoltaicPanel',
+    'hvac': 'casetta_env.modules.building.hvac:Hvac',
+    'heat_pump': 'casetta_env.modules.thermal.heat_pump:HeatPump',
+    'thermal_storage': 'casetta_env.modules.thermal.thermal_energy_storage:ThermalEnergyStorage',
+    'dhw_tank': 'casetta_env.modules.thermal.domestic_hot_water_tank:DomesticHotWaterTank',
+}
+
+# Installed packages can provide module types as entry points of this group, e.g. in pyproject.toml:
+# [project.entry-points."casetta.modules"]
+# wind_turbine = "my_package.wind:WindTurbine"
+ENTRY_POINT_GROUP = 'casetta.modules'
+
+# Exchange roles of a module, with the base class that grants them
+MODULE_ROLES = (
+    ('energy_producers', EnergyProducer),
+    ('energy_consumers', EnergyConsumer),
+    ('thermal_producers', ThermalProducer),
+    ('thermal_consumers', ThermalConsumer),
+    ('hot_water_producers', HotWaterProducer),
+    ('hot_water_consumers', HotWaterConsumer),
+)
+
+
+def register_module(module_type):
+    """
+    Class decorator registering a module class under a config type.
+
+    Args:
+        module_type (str): Value of the ``type`` field of the config sections using this class.
+    """
+    def decorator(cls):
+        cls.module_type = module_type
+        MODULE_CLASSES[module_type] = cls
+        return cls
+
+    return decorator
+
+
+def get_module_class(module_type):
+    """
+    Returns the module class registered under a config type, importing it on first use.
+    """
+    entry = MODULE_CLASSES.get(module_type)
+    if entry is None:
+        plugins = {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+        if module_type not in plugins:
+            raise ValueError(f"Unknown module type: {module_type}")
+        entry = plugins[module_type].value
+    if isinstance(entry, str):
+        module_path, class_name = entry.split(':')
+        cls = getattr(importlib.import_module(module_path), class_name)
+        if cls.module_type != module_type:  # Not decorated, or registered under another type
+            cls = register_module(module_type)(cls)
+        MODULE_CLASSES[module_type] = entry = cls
+    return entry
+
+
+@lru_cache(maxsize=None)
+def get_module_roles(cls):
+    """
+    Returns the exchange roles of a module class (see ``MODULE_ROLES``), computed once per class.
+    """
+    return tuple(role for role, base in MODULE_ROLES if issubclass(cls, base))
 
 
 def create_modules(config):
+    """
+    Creates one module per entry of ``config['modules']``, the exchange managers connecting them and the
+    exchange engine stepping all the managers at once.
+
+    Every entry is a named instance whose class is given by its ``type`` field, or by its name when
+    the field is missing, so that several instances of the same type can coexist, e.g.
+    ``"battery_2": {"type": "electric_battery", "capacity": 5.0}``.
+
+    Returns:
+        dict: The modules by name, followed by 'energy_exchange', 'thermal_exchange', 'hot_water_exchange'
+        and 'exchange', the engine.
+    """
     modules = {}
-    energy_producers = {}
-    energy_consumers = {}
-    thermal_consumers = {}
-    thermal_producer = {}
-    hot_water_consumers = {}
-    hot_water_producer = {}
-
-    for name in config['modules']:
-        if name == 'grid':
-            modules[name] = Grid(config)
-        elif name == 'electric_battery':
-            modules[name] = ElectricBattery(config)
-        elif name == 'building':
-            modules[name] = Building(config)
-        elif name == 'photovoltaic':
-            modules[name] = PhotovoltaicPanel(config)
-        elif name == 'hvac':
-            modules[name] = Hvac(config)
-        elif name == 'heat_pump':
-            modules[name] = HeatPump(config)
-        elif name == 'thermal_storage':
-            modules[name] = ThermalEnergyStorage(config)
-        elif name == 'dhw_tank':
-            modules[name] = DomesticHotWaterTank(config)
-        else:
-            raise ValueError(f"Unknown module type: {name}")
-
-        if isinstance(modules[name], EnergyProducer):
-            energy_producers[name] = modules[name]
-
-        if isinstance(modules[name], EnergyConsumer):
-            energy_consumers[name] = modules[name]
-
-        if isinstance(modules[name], ThermalProducer):
-            thermal_producer[name] = modules[name]
-
-        if isinstance(modules[name], ThermalConsumer):
-            thermal_consumers[name] = modules[name]
-
-        if isinstance(modules[name], HotWaterProducer):
-            hot_water_producer[name] = modules[name]
-
-        if isinstance(modules[name], HotWaterConsumer):
-            hot_water_consumers[name] = modules[name]
-
-    if len(thermal_producer) > 0:
-        assert len(thermal_consumers) > 0, "Thermal producers require at least one thermal consumer"
+    roles = {role: {} for role, _ in MODULE_ROLES}
+
+    for name, module_config in config['modules'].items():
+        cls = get_module_class(module_config.get('type', name))
+        modules[name] = cls(config, name)
+        for role in get_module_roles(cls):
+            roles[role][name] = modules[name]
+
+    if len(roles['thermal_producers']) > 0:
+        assert len(roles['thermal_consumers']) > 0, "Thermal producers require at least one thermal consumer"
 
     modules['energy_exchange'] = EnergyExchangeManager(
-        energy_producers=energy_producers,
-        energy_consumers=energy_consumers
+        energy_producers=roles['energy_producers'],
+        energy_consumers=roles['energy_consumers']
     )
     modules['thermal_exchange'] = ThermalExchangeManager(
-        thermal_producers=thermal_producer,
-        thermal_consumers=thermal_consumers
+        thermal_producers=roles['thermal_producers'],
+        thermal_consumers=roles['thermal_consumers']
     )
     modules['hot_water_exchange'] = HotWaterExchangeManager(
-        hot_water_producers=hot_water_producer,
-        hot_water_consumers=hot_water_consumers
+        hot_water_producers=roles['hot_water_producers'],
+        hot_water_consumers=roles['hot_water_consumers']
+    )
+    modules['exchange'] = ExchangeEngine(
+        [modules['energy_exchange'], modules['thermal_exchange'], modules['hot_water_exchange']]
     )
 
-
-    return modules
\ No newline at end of file
+    return modules
@@ -0,0 +1,63 @@
+import time
+from collections import defaultdict
+
+
+class StepProfiler:
+    """
+    Records the wall time of the sections of an environment step (module calls, exchange managers, state merging).
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(float)  # section -> cumulative seconds
+        self.calls = defaultdict(int)  # section -> number of timed calls
+        self.last_step = {}  # section -> seconds spent during the last step
+        self.steps = 0
+
+    def start_step(self):
+        self.last_step = {}
+        self.steps += 1
+
+    def time(self, section, fn, *args):
+        """
+        Calls ``fn(*args)``, records its wall time under ``section`` and returns its result.
+        """
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        self.totals[section] += elapsed
+        self.calls[section] += 1
+        self.last_step[section] = self.last_step.get(section, 0.0) + elapsed
+        return result
+
+    def reset(self):
+        self.totals.clear()
+        self.calls.clear()
+        self.last_step = {}
+        self.steps = 0
+
+    def summary(self):
+        """
+        Returns:
+            dict: For every section, its cumulative time in seconds, mean time per step in microseconds,
+            number of calls and share of the total profiled time, sorted by cumulative time.
+        """
+        grand_total = sum(self.totals.values()) or 1.0
+        return {
+            section: {
+                'total_s': total,
+                'mean_us': total / max(self.steps, 1) * 1e6,
+                'calls': self.calls[section],
+                'share': total / grand_total,
+            }
+            for section, total in sorted(self.totals.items(), key=lambda item: -item[1])
+        }
+
+    def report(self):
+        """
+        Returns the summary formatted as a text table.
+        """
+        lines = [f"{'section':<36}{'total [s]':>12}{'per step [us]':>16}{'share':>9}"]
+        for section, stats in self.summary().items():
+            lines.append(f"{section:<36}{stats['total_s']:>12.4f}{stats['mean_us']:>16.2f}{stats['share']:>9.1%}")
+        lines.append(f"{self.steps} profiled steps")
+        return '\n'.join(lines)
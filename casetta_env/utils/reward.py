@@ -0,0 +1,107 @@
+import numpy as np
+
+from casetta_env.utils.types import BuildingOutput, ElectricBatteryOutput, GridOutput
+
+
+class RewardEngine:
+    """
+    Weighted sum of cost terms evaluated on the flat state, for a single state of shape ``(len(layout),)``
+    or a batch of shape ``(..., len(layout))``. The reward is minus the weighted sum of the terms:
+
+    - 'energy_cost': energy bought from every grid minus energy sold, at the prices shown when the action
+      was taken (the 'energy_cost' of the grid output), plus the demand charges
+    - 'comfort': deviation of the internal temperature from the set point beyond ``comfort_band`` [°C]
+    - 'unmet_energy': electric load of the building left unserved [kWh]
+    - 'unmet_hot_water': hot water request of the building left unserved [L]
+    - 'battery_cycling': energy charged into and discharged from every electric battery [kWh]
+
+    Configured by the 'reward' section of the config::
+
+        "reward": {"weights": {"energy_cost": 1.0, "comfort": 0.1}, "comfort_band": 1.0, "report_terms": true}
+
+    Terms without a weight do not count; with ``report_terms`` every term is also reported in
+    ``info['reward_terms']``.
+    """
+
+    TERMS = ('energy_cost', 'comfort', 'unmet_energy', 'unmet_hot_water', 'battery_cycling')
+    KEYS = ('weights', 'comfort_band', 'report_terms')
+
+    def __init__(self, layout, config=None):
+        """
+        Args:
+            layout (StateLayout): Layout of the flat state.
+            config (dict, optional): The 'reward' section of the config; without it the reward is always zero.
+
+        Raises:
+            ValueError: If the config has unknown keys or weights unknown terms.
+        """
+        config = config or {}
+        unknown = set(config) - set(self.KEYS)
+        if unknown:
+            raise ValueError(f"Unknown reward config keys: {sorted(unknown)}")
+        weights = config.get('weights', {})
+        unknown = set(weights) - set(self.TERMS)
+        if unknown:
+            raise ValueError(f"Unknown reward terms: {sorted(unknown)}")
+        self.weights = np.array([float(weights.get(term, 0.0)) for term in self.TERMS])
+        self.comfort_band = config.get('comfort_band', 0.0)
+        self.report_terms = config.get('report_terms', False)
+        # Nothing is evaluated when no term counts or is reported
+        self.active = bool(self.weights.any()) or self.report_terms
+
+        def fields(output_type, name):
+            return np.array([
+                layout.index[f"{prefix}_{name}"]
+                for prefix, module_output in zip(layout.prefixes, layout.output_types) if module_output is output_type
+            ], dtype=np.intp)
+
+        # comfort is a clipped difference of pairs of fields and the other terms are linear in the state,
+        # so they are one matrix product
+        self._internal_temperature = fields(BuildingOutput, 'internal_temperature')
+        self._set_point = fields(BuildingOutput, 'thermal_set_point')
+        self._linear = np.zeros((len(layout), len(self.TERMS)))
+        for term, output_type, names in (
+            ('energy_cost', GridOutput, ['energy_cost', 'demand_charge']),
+            ('unmet_energy', BuildingOutput, ['unmet_energy_load']),
+            ('unmet_hot_water', BuildingOutput, ['unmet_hot_water_request']),
+            ('battery_cycling', ElectricBatteryOutput, ['charged_energy', 'discharged_energy']),
+        ):
+            for name in names:
+                self._linear[fields(output_type, name), self.TERMS.index(term)] = 1.0
+        self._linear_weights = self._linear @ self.weights
+        self._comfort_weight = self.weights[self.TERMS.index('comfort')]
+
+    def _comfort(self, state):
+        deviation = np.abs(state[..., self._internal_temperature] - state[..., self._set_point])
+        return np.maximum(deviation - self.comfort_band, 0.0).sum(axis=-1)
+
+    def terms(self, state):
+        """
+        Returns:
+            np.ndarray: The value of every term of ``TERMS``, of shape ``state.shape[:-1] + (len(TERMS),)``.
+        """
+        state = np.asarray(state)
+        terms = state @ self._linear
+        terms[..., self.TERMS.index('comfort')] = self._comfort(state)
+        return terms
+
+    def __call__(self, state):
+        """
+        Returns the reward of a state (a float) or of a batch of states (an array).
+        """
+        state = np.asarray(state)
+        reward = -(state @ self._linear_weights + self._comfort_weight * self._comfort(state))
+        return float(reward) if np.ndim(reward) == 0 else reward
+
+    def evaluate(self, state, info):
+        """
+        Returns the reward of a state, adding the terms to ``info['reward_terms']`` when ``report_terms`` is set.
+        """
+        if not self.active:
+            return 0.0 if np.ndim(state) == 1 else np.zeros(np.shape(state)[:-1])
+        if not self.report_terms:
+            return self(state)
+        terms = self.terms(state)
+        info['reward_terms'] = dict(zip(self.TERMS, np.moveaxis(terms, -1, 0)))
+        reward = -(terms @ self.weights)
+        return float(reward) if np.ndim(reward) == 0 else reward
@@ -0,0 +1,87 @@
+import math
+
+
+class ModuleScheduler:
+    """
+    Steps modules at their own rate, given by the 'step_period' of their config in base ticks (1 by default).
+
+    A module with period ``m`` runs in windows of ``m`` ticks: ``step()`` opens the window on its first tick,
+    the exchange managers keep routing energy to and from the module on every tick of the window (its flows
+    accumulate as in a single step), and ``get_state()`` closes the window on its last tick. In between, the
+    merged state holds the output of the previous window, so that the exchange managers and the observation
+    see a consistent state at every tick. All the windows close at the end of the episode.
+
+    The clock module (the building) steps on every tick; a period in its config only slows down its own
+    internal dynamics.
+    """
+
+    def __init__(self, modules, clock):
+        """
+        Args:
+            modules (list[BaseModule]): Modules of the merged state, in layout order.
+            clock (Building): Module counting the ticks of the episode in ``cursor``.
+        """
+        self.modules = modules
+        self.clock = clock
+        self.periods = [1 if module is clock else module.step_period for module in modules]
+        self.single_rate = all(period == 1 for period in self.periods)
+        # Modules opening and closing a window, for every tick of the scheduling cycle
+        cycle = math.lcm(*self.periods)
+        self._opening = [[i for i, p in enumerate(self.periods) if tick % p == 0] for tick in range(cycle)]
+        self._closing = [[i for i, p in enumerate(self.periods) if (tick + 1) % p == 0] for tick in range(cycle)]
+        self._tick = 0
+        self.outputs = None  # Latest output of every module
+
+    def reset(self, outputs):
+        """
+        Restarts the windows from the given module outputs.
+        """
+        self.outputs = list(outputs)
+
+    def at_window_boundary(self):
+        """
+        Returns whether no window is open, i.e. the module values carry over between ticks completely.
+        """
+        return self.single_rate or self.clock.cursor % len(self._opening) == 0 or self.clock.is_horizon_reached
+
+    def opening(self):
+        """
+        Returns the positions of the modules to step at this tick; call before stepping them.
+        """
+        if self.single_rate:
+            return range(len(self.modules))
+        self._tick = self.clock.cursor
+        return self._opening[self._tick % len(self._opening)]
+
+    def closing(self):
+        """
+        Returns the positions of the modules whose window closes at this tick, after stepping them.
+        """
+        if self.single_rate or self.clock.is_horizon_reached:
+            return range(len(self.modules))
+        return self._closing[self._tick % len(self._closing)]
+
+    def step(self, previous_state, action):
+        """
+        Steps the modules whose window opens at this tick; call before stepping the exchange engine.
+        """
+        if self.single_rate:
+            for module in self.modules:
+                module.step(previous_state, action)
+            return
+        modules = self.modules
+        for i in self.opening():
+            modules[i].step(previous_state, action)
+
+    def get_states(self):
+        """
+        Closes the windows ending at this tick.
+
+        Returns:
+            list: The current output of every module.
+        """
+        if self.single_rate:
+            return [module.get_state() for module in self.modules]
+        for i in self.closing():
+            self.outputs[i] = self.modules[i].get_state()
+        return self.outputs
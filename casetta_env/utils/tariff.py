@@ -0,0 +1,111 @@
+import numpy as np
+
+BILLING_PERIODS = ('month', 'day')
+
+
+class Tariff:
+    """
+    Electricity tariff of a grid connection, configured by the 'tariff' section of the grid config::
+
+        "tariff": {
+            "periods": [
+                {"buy": 0.25, "sell": 0.05, "hours": [17, 21], "weekdays": [0, 1, 2, 3, 4]},
+                {"buy": 0.06, "hours": [0, 6], "months": [11, 12, 1, 2]}
+            ],
+            "blocks": [[300.0, 0.0], [null, 0.03]],
+            "export_cap": 1.0,
+            "demand_charge": 8.0,
+            "billing_period": "month"
+        }
+
+    - 'periods': time-of-use prices. A period covers the hours ``[start, end)`` of the listed weekdays
+      (Monday is 0) and months, all of them when omitted. A period wrapping midnight, e.g. ``[22, 6]``, covers
+      ``[22, 24)`` and ``[0, 6)`` of the same days. The first matching period sets the buy and sell
+      prices of a step, the base prices apply elsewhere. Real-time prices (the 'buy_price'/'sell_price'
+      columns of the data source) replace the prices of the periods.
+    - 'blocks': block rates, ``[limit, surcharge]`` pairs in increasing order. The surcharge is added to
+      the buy price while the energy bought in the billing period is below the limit (``null`` for no limit).
+    - 'export_cap': maximum energy sold in one step [kWh].
+    - 'demand_charge': price of the peak demand of the billing period [$ per kW], charged step by step
+      as the peak grows.
+    - 'billing_period': 'month' or 'day', the period after which blocks and peak demand start over.
+
+    Prices are not evaluated rule by rule at every step: the periods are compiled into a table indexed by
+    month, weekday and hour, from which ``price_profiles()`` builds the price of every step of an episode.
+    """
+
+    def __init__(self, config, buy_price, sell_price):
+        """
+        Args:
+            config (dict, optional): The 'tariff' section of the grid config; without it prices are constant.
+            buy_price (float): Base buy price [$ per kWh].
+            sell_price (float): Base sell price [$ per kWh].
+        """
+        config = config or {}
+        periods = config.get('periods', [])
+        # Period 0 holds the base prices
+        self.buy_prices = np.array([buy_price] + [period.get('buy', buy_price) for period in periods], dtype=float)
+        self.sell_prices = np.array([sell_price] + [period.get('sell', sell_price) for period in periods], dtype=float)
+        self.period_table = np.zeros((12, 7, 24), dtype=np.intp)  # Period of every (month - 1, weekday, hour)
+        for index, period in reversed(list(enumerate(periods, start=1))):
+            months = np.array(period.get('months', range(1, 13))) - 1
+            weekdays = np.array(period.get('weekdays', range(7)))
+            self.period_table[np.ix_(months, weekdays, _period_hours(period.get('hours', (0, 24))))] = index
+
+        blocks = config.get('blocks', [])
+        limits = [np.inf if limit is None else float(limit) for limit, _ in blocks]
+        surcharges = [float(surcharge) for _, surcharge in blocks]
+        if not limits or limits[-1] != np.inf:
+            limits.append(np.inf)
+            surcharges.append(surcharges[-1] if surcharges else 0.0)
+        self.block_limits = np.array(limits)
+        self.block_surcharges = np.array(surcharges)
+        self.has_blocks = bool(self.block_surcharges.any())
+
+        self.export_cap = config.get('export_cap')
+        self.demand_charge = float(config.get('demand_charge', 0.0))
+        self.billing_period = config.get('billing_period', 'month')
+        if self.billing_period not in BILLING_PERIODS:
+            raise ValueError(f"Unknown billing period: {self.billing_period}")
+
+    def price_profiles(self, calendar, realtime=None):
+        """
+        Resolves the prices of every step of an episode.
+
+        Args:
+            calendar (dict[str, np.ndarray]): Calendar of the steps, see ``make_calendar``.
+            realtime (dict[str, np.ndarray], optional): Real-time 'buy'/'sell' price profiles.
+
+        Returns:
+            tuple[dict[str, np.ndarray], np.ndarray]: The 'buy' and 'sell' price profiles, and the
+            billing period of every step (an integer that changes when a new period starts).
+        """
+        month = np.asarray(calendar['month'])
+        periods = self.period_table[month - 1, np.asarray(calendar['weekday']), np.asarray(calendar['hour'])]
+        profiles = {'buy': self.buy_prices[periods], 'sell': self.sell_prices[periods]}
+        for kind, profile in (realtime or {}).items():
+            profiles[kind] = np.asarray(profile, dtype=float)
+        billing = np.asarray(calendar['year']) * 12 + month
+        if self.billing_period == 'day':
+            billing = billing * 31 + np.asarray(calendar['day'])
+        return profiles, billing
+
+    def block_surcharge(self, energy):
+        """
+        Returns the surcharge of the buy price after ``energy`` kWh bought in the billing period
+        (a float or an array like ``energy``).
+        """
+        return self.block_surcharges[np.searchsorted(self.block_limits, energy, side='right')]
+
+
+def _period_hours(hours):
+    """
+    Returns the hours of the day covered by the ``[start, end)`` hours of a period, wrapping midnight
+    when ``end`` is lower than ``start``.
+    """
+    start, end = hours
+    if not (0 <= start < 24 and 0 < end <= 24) or start == end:
+        raise ValueError(f"Invalid tariff period hours: {list(hours)}")
+    if start < end:
+        return np.arange(start, end)
+    return np.concatenate([np.arange(start, 24), np.arange(0, end)])
@@ -0,0 +1,158 @@
+import argparse
+import datetime
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from casetta_env.utils.common import make_calendar
+
+
+class TimeSeriesSource:
+    """
+    Regular time series stored as one ``.npy`` file per column and opened memory-mapped,
+    so that many worker processes share a single on-disk (and page-cache) copy and an
+    episode only touches the pages of its own window.
+
+    Besides the data columns, every source holds the calendar columns of each step
+    ('weekday', 'day', 'month', 'year', 'hour', 'minute').
+
+    The ``offset`` of the current episode belongs to one environment: copies of a source (``copy.deepcopy``,
+    as when instantiating a compiled scenario) share the memory-mapped columns but seek independently.
+    """
+
+    META_FILE = 'meta.json'
+    CALENDAR_COLUMNS = ('weekday', 'day', 'month', 'year', 'hour', 'minute')
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Directory written by ``TimeSeriesSource.from_csv``.
+        """
+        self.path = path
+        with open(os.path.join(path, self.META_FILE)) as f:
+            meta = json.load(f)
+        self.time_step = meta['time_step']
+        self.start = datetime.datetime.fromisoformat(meta['start'])
+        self.length = meta['length']
+        self.columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+            for name in meta['columns'] + list(self.CALENDAR_COLUMNS)
+        }
+        self.offset = 0  # First step of the current episode
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __reduce__(self):
+        # Pickled by path: unpickling reopens the memory-mapped files (once per process) instead of copying them
+        return _open_source, (self.path,)
+
+    def __copy__(self):
+        source = object.__new__(TimeSeriesSource)
+        source.__dict__.update(self.__dict__)  # The columns dict is shared, the offset is not
+        return source
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+    def seek(self, offset):
+        """
+        Moves the start of the current episode to the given step.
+        """
+        if not 0 <= offset < self.length:
+            raise ValueError(f"Offset {offset} is outside of the time series ({self.length} steps)")
+        self.offset = offset
+
+    def random_offset(self, length):
+        """
+        Draws a random episode start such that ``length`` steps fit in the series.
+        """
+        if length > self.length:
+            raise ValueError(f"Episodes of {length} steps do not fit in the time series ({self.length} steps)")
+        return np.random.randint(0, self.length - length + 1)
+
+    def start_episode(self, length, start_index=None, random_start=False):
+        """
+        Positions the source for a new episode of ``length`` steps.
+
+        Args:
+            length (int): Number of steps the episode reads.
+            start_index (int, optional): Explicit first step of the episode.
+            random_start (bool): Whether to draw the first step at random when no index is given.
+        """
+        if start_index is None:
+            start_index = self.random_offset(length) if random_start else 0
+        self.seek(start_index)
+
+    def window(self, name, length):
+        """
+        Returns a memory-mapped view of ``length`` steps of a column from the current offset.
+        """
+        if self.offset + length > self.length:
+            raise ValueError(f"The time series ends before step {self.offset + length}")
+        return self.columns[name][self.offset:self.offset + length]
+
+    @classmethod
+    def from_csv(cls, csv_path, path, time_step, start):
+        """
+        Converts a CSV file with a header row and one numeric column per signal into the
+        memory-mappable format. This is meant to be done once per data set.
+
+        Args:
+            csv_path (str): Input CSV file, one row per time step.
+            path (str): Output directory.
+            time_step (int): Time step of the rows in minutes.
+            start (datetime.datetime): Date and time of the first row.
+
+        Returns:
+            TimeSeriesSource: The converted source.
+        """
+        data = np.genfromtxt(csv_path, delimiter=',', names=True, dtype=np.float64)
+        os.makedirs(path, exist_ok=True)
+        for name in data.dtype.names:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(data[name]))
+        calendar = make_calendar(start, time_step, len(data))
+        for name in cls.CALENDAR_COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"), calendar[name].astype(np.int16))
+
+        with open(os.path.join(path, cls.META_FILE), 'w') as f:
+            json.dump({
+                'time_step': time_step,
+                'start': start.isoformat(),
+                'length': len(data),
+                'columns': list(data.dtype.names),
+            }, f, indent=4)
+        return cls(path)
+
+
+@lru_cache(maxsize=None)
+def _open_source(path):
+    return TimeSeriesSource(path)
+
+
+def get_data_source(config):
+    """
+    Returns the time series source configured under ``config['data_source']``, or None.
+    Modules of the same process share one instance per directory; environments instantiated from a compiled
+    scenario hold their own copy of it, see ``TimeSeriesSource``.
+    """
+    if 'data_source' not in config:
+        return None
+    source = _open_source(os.path.abspath(config['data_source']['path']))
+    if source.time_step != config['time_step']:
+        raise ValueError(f"The data source has a time step of {source.time_step} minutes, "
+                         f"the environment uses {config['time_step']}")
+    return source
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a CSV time series into a memory-mappable data source.")
+    parser.add_argument('csv_path')
+    parser.add_argument('path')
+    parser.add_argument('--time-step', type=int, default=5, help="Time step of the rows in minutes")
+    parser.add_argument('--start', type=datetime.datetime.fromisoformat, default=datetime.datetime(2010, 1, 1),
+                        help="ISO date and time of the first row")
+    args = parser.parse_args()
+    TimeSeriesSource.from_csv(args.csv_path, args.path, args.time_step, args.start)
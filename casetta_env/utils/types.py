@@ -25,6 +25,8 @@ class GridOutput:
     sell_price: float
     sold_energy: float
     bought_energy: float
+    demand_charge: float
+    energy_cost: float
 
 @dataclass
 class ElectricBatteryOutput:
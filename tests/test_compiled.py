@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from benchmarks.common import random_actions
+from casetta_env.casetta import compiled
+from casetta_env.casetta.casetta import Casetta
+from casetta_env.utils.common import load_config
+
+N_STEPS = 600  # Crosses the 17:00 time-of-use boundary of the tariff below
+
+
+def _default_config():
+    config = load_config('config/config.json')
+    config['horizon_days'] = 3
+    return config
+
+
+def _tariff_config():
+    config = _default_config()
+    config['modules']['grid']['tariff'] = {
+        "periods": [{"buy": 0.25, "sell": 0.05, "hours": [17, 21]}, {"buy": 0.06, "hours": [22, 6]}],
+        "blocks": [[5.0, 0.0], [20.0, 0.02], [None, 0.05]],
+        "export_cap": 0.3,
+        "demand_charge": 8.0,
+        "billing_period": "day"
+    }
+    return config
+
+
+CONFIGS = {'default': _default_config, 'tariff': _tariff_config}
+
+
+def _assert_equivalent(config, observation_mode):
+    """
+    Runs the same actions with both backends, through ``step()`` then ``rollout()``, and checks that states,
+    rewards and the values the modules carry between steps are identical.
+    """
+    envs = [Casetta(config, observation_mode=observation_mode, backend=backend) for backend in Casetta.BACKENDS]
+    actions = random_actions(envs[0], 2 * N_STEPS)
+    for env in envs:
+        env.reset(seed=0)
+
+    for t, action in enumerate(actions[:N_STEPS]):
+        (_, expected_reward, *_), (_, reward, *_) = (env.step(action) for env in envs)
+        assert reward == pytest.approx(expected_reward, rel=1e-12, abs=1e-12), f"step {t}"
+        # Snapshots hold the current state and the values the modules carry between steps
+        assert np.array_equal(envs[0].get_snapshot(), envs[1].get_snapshot()), f"step {t}"
+        assert np.array_equal(envs[0].exchange.flows, envs[1].exchange.flows), f"step {t}"
+
+    expected, actual = (env.rollout(actions[N_STEPS:]) for env in envs)
+    assert np.array_equal(expected[0], actual[0])
+    np.testing.assert_allclose(actual[1], expected[1], rtol=1e-12, atol=1e-12)
+    assert np.array_equal(expected[2], actual[2])
+    assert np.array_equal(expected[3], actual[3])
+    assert np.array_equal(envs[0].get_snapshot(), envs[1].get_snapshot())
+    return expected
+
+
+@pytest.mark.parametrize('observation_mode', Casetta.OBSERVATION_MODES)
+@pytest.mark.parametrize('config', CONFIGS)
+def test_compiled_matches_python(config, observation_mode):
+    _, rewards, *_ = _assert_equivalent(CONFIGS[config](), observation_mode)
+    assert rewards.any()
+
+
+def test_tariff_config_is_exercised():
+    env = Casetta(_tariff_config(), observation_mode='array')
+    env.reset(seed=0)
+    observations, *_ = env.rollout(random_actions(env, 2 * N_STEPS))
+    index = env.observation_index
+    assert len(np.unique(observations[:, index['grid_buy_price']])) > 3  # Periods and block surcharges
+    assert observations[:, index['grid_sold_energy']].max() == pytest.approx(0.3)
+    assert observations[:, index['grid_demand_charge']].any()
+
+
+def test_compiled_matches_python_without_numba(monkeypatch):
+    # The pure Python fallback runs the undecorated kernel functions
+    for name in ('_produce', '_consume', '_clip', 'simulate'):
+        function = getattr(compiled, name)
+        monkeypatch.setattr(compiled, name, getattr(function, 'py_func', function))
+    _assert_equivalent(_tariff_config(), 'array')
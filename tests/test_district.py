@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from casetta_env.casetta.district_casetta import DistrictCasetta
+from casetta_env.utils.common import load_config
+
+NUM_BUILDINGS = 4
+
+
+def _config():
+    config = load_config('config/config.json')
+    config['horizon_days'] = 2
+    return config
+
+
+def _route_action(env, *names, share=1.0):
+    action = np.zeros(env.action_space.shape)
+    for name in names:
+        action[:, env.action_layout.index[name]] = share
+    return action
+
+
+def test_grid_capacity_caps_imports():
+    env = DistrictCasetta(NUM_BUILDINGS, _config(), grid_capacity=5.0)
+    env.reset(seed=0)
+    _, _, _, _, info = env.step(_route_action(env, 'energy_grid_to_electric_battery'))
+    assert info['grid_import'] == pytest.approx(5.0)
+    assert info['grid_factor'] == pytest.approx(5.0 / (NUM_BUILDINGS * 3.0))
+
+
+def test_grid_capacity_caps_exports():
+    env = DistrictCasetta(NUM_BUILDINGS, _config(), grid_capacity=2.0)
+    env.reset(seed=0)
+    charge = _route_action(env, 'energy_grid_to_electric_battery', share=0.5 / NUM_BUILDINGS)
+    for _ in range(4):  # 1.5 kWh into every battery, under the capacity
+        env.step(charge)
+    stored = env.state[:, env.observation_index['electricbattery_stored_energy']]
+    assert stored == pytest.approx(np.full(NUM_BUILDINGS, 1.5))
+
+    _, _, _, _, info = env.step(_route_action(env, 'energy_electric_battery_to_grid'))
+    assert info['grid_export'] == pytest.approx(2.0)
+    assert info['grid_export_factor'] == pytest.approx(2.0 / (NUM_BUILDINGS * 1.5))
+    stored = env.state[:, env.observation_index['electricbattery_stored_energy']]
+    assert stored == pytest.approx(np.full(NUM_BUILDINGS, 1.5 - 2.0 / NUM_BUILDINGS))
@@ -0,0 +1,34 @@
+import pytest
+
+from casetta_env.casetta.parallel_district_casetta import ParallelDistrictCasetta
+from casetta_env.utils.common import load_config
+
+
+def test_worker_error_is_raised_in_parent():
+    config = load_config('config/config.json')
+    config['horizon_days'] = 1
+    env = ParallelDistrictCasetta(4, config, num_workers=2)
+    try:
+        env.reset(seed=0)
+        action = env.action_space.sample() * 0.0
+        truncated = False
+        while not truncated:
+            *_, truncated, _ = env.step(action)
+        with pytest.raises(RuntimeError, match="AssertionError"):
+            env.step(action)  # Past the horizon
+        env.reset(seed=0)  # The workers keep serving commands
+        env.step(action)
+    finally:
+        env.close()
+    assert env._observations_memory is None
+
+
+def test_close_after_worker_exit():
+    env = ParallelDistrictCasetta(2, num_workers=2)
+    env.reset(seed=0)
+    env._processes[0].kill()
+    env._processes[0].join()
+    with pytest.raises(RuntimeError, match="exited"):
+        env.step(env.action_space.sample())
+    env.close()
+    assert env._observations_memory is None
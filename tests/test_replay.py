@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from casetta_env.casetta.casetta import Casetta
+from casetta_env.casetta.replay_casetta import ReplayCasetta
+from casetta_env.casetta.trajectory_recorder import TrajectoryRecorder
+
+
+def _record(path, n_steps):
+    recorder = TrajectoryRecorder(Casetta(observation_mode='array'), str(path))
+    recorder.reset(seed=0)
+    for _ in range(n_steps):
+        recorder.step(np.full(recorder.action_space.shape, 0.5))
+    recorder.close()
+
+
+def test_replays_recording(tmp_path):
+    _record(tmp_path, 3)
+    env = ReplayCasetta(str(tmp_path))
+    env.reset()
+    assert len(env) == 3 and env.sample(5)['observations'].shape[0] == 5
+
+
+def test_empty_recording_is_rejected(tmp_path):
+    _record(tmp_path, 0)
+    with pytest.raises(ValueError, match="no transition"):
+        ReplayCasetta(str(tmp_path))
@@ -0,0 +1,22 @@
+import pytest
+
+from casetta_env.casetta.casetta import Casetta
+from casetta_env.utils.reward import RewardEngine
+
+
+@pytest.fixture
+def layout():
+    return Casetta(observation_mode='array').state_layout
+
+
+@pytest.mark.parametrize('config', [
+    {'weights': {'energy_costs': 1.0}},
+    {'weights': {'energy_cost': 1.0}, 'report_term': True},
+])
+def test_unknown_keys_are_rejected(layout, config):
+    with pytest.raises(ValueError, match="Unknown reward"):
+        RewardEngine(layout, config)
+
+
+def test_without_config_reward_is_zero(layout):
+    assert not RewardEngine(layout).active
@@ -0,0 +1,57 @@
+import datetime
+import os
+
+import numpy as np
+
+from casetta_env.casetta import scenario
+from casetta_env.casetta.casetta import Casetta
+from casetta_env.utils.common import load_config
+from casetta_env.utils.timeseries import TimeSeriesSource
+
+
+def _config():
+    config = load_config('config/config.json')
+    config['horizon_days'] = 2
+    return config
+
+
+def test_disk_cache_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(scenario, '_scenarios', {})  # Compiled by no earlier test
+    compiled = scenario.compile_scenario(_config(), cache_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == [f"{compiled.key}.pkl"]
+
+    monkeypatch.setattr(scenario, '_scenarios', {})  # As in a new process
+    loaded = scenario.compile_scenario(_config(), cache_dir=str(tmp_path))
+    assert loaded is not compiled and loaded.key == compiled.key
+    actions = np.full((50, compiled.action_space.shape[0]), 0.5)
+    outputs = []
+    for source in (compiled, loaded):
+        env = Casetta(source, observation_mode='array')
+        env.reset(seed=0)
+        outputs.append(env.rollout(actions)[0])
+    assert np.array_equal(*outputs)
+
+
+def test_key_depends_on_package_sources(monkeypatch):
+    key = scenario.scenario_key(_config())
+    monkeypatch.setattr(scenario, 'source_hash', lambda: 'other sources')
+    assert scenario.scenario_key(_config()) != key
+
+
+def test_instances_seek_their_data_source_independently(tmp_path):
+    csv_path = tmp_path / 'series.csv'
+    csv_path.write_text('solar_irradiation\n' + ''.join(f"{i}\n" for i in range(3 * 288)))
+    TimeSeriesSource.from_csv(str(csv_path), str(tmp_path / 'source'), 5, datetime.datetime(2020, 1, 1))
+    config = _config()
+    config['horizon_days'] = 1
+    config['data_source'] = {'path': str(tmp_path / 'source')}
+    compiled = scenario.compile_scenario(config)
+
+    first, second = (Casetta(compiled, observation_mode='array') for _ in range(2))
+    assert first.data_source is first.modules['grid'].data_source
+    assert first.data_source.columns is second.data_source.columns
+    first.reset(options={'start_index': 10})
+    second.reset(options={'start_index': 200})
+    assert (first.data_source.offset, second.data_source.offset) == (10, 200)
+    irradiation = first.observation_index['building_solar_irradiation']
+    assert (first.state[irradiation], second.state[irradiation]) == (10.0, 200.0)
@@ -0,0 +1,89 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from casetta_env.casetta.casetta import Casetta
+from casetta_env.casetta.vector_casetta import VectorCasetta
+from casetta_env.utils.common import get_state_layout
+from casetta_env.utils.types import BuildingOutput, GridOutput
+
+
+@pytest.fixture
+def layout():
+    return get_state_layout("State", (BuildingOutput, GridOutput), ('building', 'grid'))
+
+
+def _write_attempts(previous_state):
+    """
+    Tries every way a module could write into the previous state, and returns the attempts that succeeded.
+    """
+    succeeded = []
+    try:
+        previous_state.building_internal_temperature = 999.0
+        succeeded.append('setattr')
+    except (AttributeError, dataclasses.FrozenInstanceError):
+        pass
+    value = previous_state.building_internal_temperature
+    if isinstance(value, np.ndarray):
+        try:
+            value[:] = 999.0
+            succeeded.append('column')
+        except ValueError:
+            pass
+    return succeeded
+
+
+def test_frozen_dataclass_cannot_be_written(layout):
+    state = layout.from_array(np.arange(len(layout), dtype=float))
+    assert _write_attempts(state) == []
+
+
+def test_flat_view_cannot_be_written(layout):
+    buffer = np.arange(len(layout), dtype=float)
+    view = layout.view(buffer)
+    assert _write_attempts(view) == []
+    buffer[layout.index['building_internal_temperature']] = 21.0  # The buffer itself stays writable
+    assert view.building_internal_temperature == 21.0
+
+
+def test_batched_view_cannot_be_written(layout):
+    buffer = np.zeros((3, len(layout)))
+    view = layout.view(buffer)
+    assert _write_attempts(view) == []
+    assert not buffer.any()
+    buffer[:, layout.index['grid_buy_price']] = 0.2
+    assert np.array_equal(view.grid_buy_price, np.full(3, 0.2))
+
+
+def _spy_on_module_steps(modules, monkeypatch):
+    """
+    Wraps the step of every module so that it first tries to write into the previous state it receives.
+    """
+    succeeded = []
+    for module in modules:
+        def step(state, action, original=module.step):
+            succeeded.extend(_write_attempts(state))
+            return original(state, action)
+        monkeypatch.setattr(module, 'step', step)
+    return succeeded
+
+
+@pytest.mark.parametrize('observation_mode', Casetta.OBSERVATION_MODES)
+def test_module_step_cannot_write_previous_state(observation_mode, monkeypatch):
+    env = Casetta(observation_mode=observation_mode)
+    succeeded = _spy_on_module_steps(env.state_modules, monkeypatch)
+    env.reset(seed=0)
+    env.step(np.full(env.action_space.shape, 0.5))
+    assert succeeded == []
+
+
+def test_batched_module_step_cannot_write_previous_state(monkeypatch):
+    env = VectorCasetta(3)
+    succeeded = _spy_on_module_steps(env.state_modules, monkeypatch)
+    env.reset(seed=0)
+    previous = env._buffers[env._front]
+    before = previous.copy()
+    env.step(np.full(env.action_space.shape, 0.5))
+    assert succeeded == []
+    assert np.array_equal(previous, before)  # Untouched until it becomes the output buffer of the next step